@@ -0,0 +1,88 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Query a running analysis_server.py.
+
+Usage: analysis_client.py [--socket PATH] top
+       analysis_client.py [--socket PATH] hierarchy [TOP_MODULE] [--max-depth N]
+       analysis_client.py [--socket PATH] module MODULE
+       analysis_client.py [--socket PATH] stop
+
+Forwards the query over the server's Unix domain socket and writes the
+response to stdout as it arrives. Only standard library modules are
+imported, so the client starts quickly.
+'''
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import Any, Iterator
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f'analysis_server-{os.getuid()}.sock') \
+    if hasattr(os, 'getuid') else os.path.join(tempfile.gettempdir(), 'analysis_server.sock')
+
+class QueryError(Exception):
+    '''Error reported by the server.'''
+
+def query(request: dict[str, Any], socket_path: str = DEFAULT_SOCKET) -> Iterator[str]:
+    '''Sends a request and yields the lines of the response.
+
+    The request is a JSON object line; the response is a status line, either
+    'ok' or 'error MESSAGE', followed by output lines until the server closes
+    the connection.
+
+    Raises:
+        QueryError: when the server reports an error.
+        OSError: when the server can't be reached.
+    '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('r', encoding='utf-8', newline='\n') as response:
+            status = response.readline().rstrip('\n')
+            if status != 'ok':
+                raise QueryError(status.partition(' ')[2] or 'connection closed')
+            for line in response:
+                yield line.rstrip('\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Query a running analysis server.')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='server socket path')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('top', help='print top modules')
+    hierarchy = commands.add_parser('hierarchy', help='print instance hierarchy')
+    hierarchy.add_argument('top', nargs='?', help='top module (default: all top modules)')
+    hierarchy.add_argument('--max-depth', type=int, help='maximum instance depth')
+    module = commands.add_parser('module', help='print module information as JSON')
+    module.add_argument('name', help='module name')
+    commands.add_parser('stop', help='stop the server')
+    args = parser.parse_args()
+
+    request = {key: value for key, value in vars(args).items() if key != 'socket' and value is not None}
+    output = sys.stdout
+    try:
+        for line in query(request, args.socket):
+            output.write(line + '\n')
+    except QueryError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f'Error: cannot connect to {args.socket}: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
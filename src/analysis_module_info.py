@@ -36,9 +36,15 @@ source files. Extracted information:
 import sys
 import platform
 import pathlib
+import collections
+import concurrent.futures
+import functools
+import os
 import anytree
-from typing import Any, Optional
+from typing import Any, Callable, Iterator, Optional
 
+import design_db
+import tree_query
 import verible_verilog_syntax
 
 class _InstanceBase(anytree.NodeMixin):
@@ -47,23 +53,73 @@ class _InstanceBase(anytree.NodeMixin):
         self.name = name
         self.parent = parent
 
+    def _pre_attach(self, parent: '_InstanceBase'):
+        # Expand the new parent first, so that expanding it later doesn't drop this node
+        if isinstance(parent, BranchInstance):
+            parent.children
+
 class BranchInstance(_InstanceBase):
+    '''Instance with child instances.
+
+    If `expand` is given, it is called to create the children when they are
+    first accessed, instead of passing `children` up front. Properties that
+    anytree computes from its private child list (is_leaf, height) expand the
+    node first.
+    '''
     def __init__(self, name: str, module_info: Optional[verible_verilog_syntax.SyntaxData] = None,
-        parent: Optional['_InstanceBase'] = None, children: Optional[list['_InstanceBase']] = None):
+        parent: Optional['_InstanceBase'] = None, children: Optional[list['_InstanceBase']] = None,
+        expand: Optional[Callable[[], list['_InstanceBase']]] = None):
         super().__init__(name, parent)
         self.module_info = module_info
         self.children = children if children is not None else []
+        self._expand = expand
+
+    @property
+    def children(self) -> tuple['_InstanceBase', ...]:
+        if getattr(self, '_expand', None) is not None:
+            expand, self._expand = self._expand, None
+            # Expanded children are new nodes, so they are attached directly,
+            # without anytree's walk over the ancestors checking for loops
+            children = expand()
+            for child in children:
+                child._NodeMixin__parent = self
+            self._NodeMixin__children = children
+        return anytree.NodeMixin.children.fget(self)
+
+    @children.setter
+    def children(self, children: list['_InstanceBase']):
+        self._expand = None
+        anytree.NodeMixin.children.fset(self, children)
+
+    @children.deleter
+    def children(self):
+        self._expand = None
+        anytree.NodeMixin.children.fdel(self)
+
+    @property
+    def is_leaf(self) -> bool:
+        return not self.children
+
+    @property
+    def height(self) -> int:
+        return verible_verilog_syntax.subtree_height(self)
 
     def RenderTree(self) -> None:
+        for line in self.render_lines():
+            print(line)
+
+    def render_lines(self) -> Iterator[str]:
+        '''Yields the lines printed by RenderTree().'''
         for pre, _, node in anytree.RenderTree(self):
             treestr = u'%s%s' % (pre, node.name)
             instance_type = node.module_info['name'] if node.__class__.__name__ != 'UnfoundedInstance' else '-'
-            print(f'{treestr.ljust(8)} ({instance_type}): {node.__class__.__name__}')
+            yield f'{treestr.ljust(8)} ({instance_type}): {node.__class__.__name__}'
 
 class RootInstance(BranchInstance):
     def __init__(self, name: str, module_info: Optional[verible_verilog_syntax.SyntaxData] = None,
-        children: Optional[list['_InstanceBase']] = None):
-        super().__init__(name, module_info, None, children)
+        children: Optional[list['_InstanceBase']] = None,
+        expand: Optional[Callable[[], list['_InstanceBase']]] = None):
+        super().__init__(name, module_info, None, children, expand)
 
 class LeafInstance(_InstanceBase):
     def __init__(self, name: str, module_info: Optional[verible_verilog_syntax.SyntaxData] = None,
@@ -76,16 +132,442 @@ class UnfoundedInstance(_InstanceBase):
         self.parent = parent
         super().__init__(name, parent)
 
+class RecursiveInstance(_InstanceBase):
+    '''Instance of a module which (indirectly) instantiates itself; not expanded.'''
+    def __init__(self, name: str, module_info: Optional[verible_verilog_syntax.SyntaxData] = None,
+        parent: Optional['_InstanceBase'] = None):
+        super().__init__(name, parent)
+        self.module_info = module_info
+
+def module_instances(module_info: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    '''Yields (instance name, module type) of each instance in a module.
+
+    Instance names are paired with types by position only when there is one
+    name per type; otherwise (e.g. several instances in one instantiation,
+    ``foo u1(), u2();``) the module type is used as the name, made unique by
+    appending '#N' to its N-th use. Instance trees and exported hierarchies
+    use these names.
+    '''
+    names = module_info['instances']['name']
+    types = module_info['instances']['type']
+    if len(names) == len(types):
+        return zip(names, types)
+    uses = collections.Counter()
+    unique_names = []
+    for type_ in types:
+        uses[type_] += 1
+        unique_names.append(type_ if uses[type_] == 1 else f'{type_}#{uses[type_]}')
+    return zip(unique_names, types)
+
+class ModuleHierarchy:
+    '''Module hierarchy elaborated as a DAG of module types.
+
+    Each module type is expanded once into its edges: the instantiated module
+    types with the number of their instances. Instance trees and flattened
+    instance counts are derived from the DAG, so shared subtrees of highly
+    replicated designs are not duplicated.
+
+    Instantiations closing a cycle are not expanded. Each cycle (a strongly
+    connected set of modules) is cut at the back edges of a depth-first search
+    within it, started from its entry module: the first by name of the modules
+    instantiated from outside the cycle, or of all its modules. Back edges so
+    depend only on the cycle and its parents, and are updated locally. Instances
+    deeper than `max_depth` below a top module are left out.
+
+    Args:
+        modules_info: Module information, as in AnalysisModuleInfo.modules_info.
+        top_modules: Names of the top modules.
+        max_depth: Maximum instance depth; None for no limit.
+    '''
+    def __init__(self, modules_info: dict[str, dict[str, Any]], top_modules: list[str],
+        max_depth: Optional[int] = None):
+        self.modules_info = modules_info
+        self.top_modules = top_modules
+        self.max_depth = max_depth
+        self.edges = {}
+        # Module name -> names of modules instantiating it
+        self._parents = {}
+        for name in modules_info:
+            self._set_edges(name)
+        self.back_edges = set()
+        # Module name -> modules of its cycle, for modules on a cycle
+        self._cycles = {}
+        # Cycle -> its back edges
+        self._cycle_back_edges = {}
+        for cycle in self._find_cycles():
+            self._set_cycle(cycle)
+        # Module name -> {depth: instance count}
+        self._counts = {}
+
+    def _set_edges(self, name: str):
+        for child in self.edges.pop(name, {}):
+            self._parents[child].discard(name)
+        if name in self.modules_info:
+            self.edges[name] = collections.Counter(self.modules_info[name]['instances']['type'])
+            for child in self.edges[name]:
+                self._parents.setdefault(child, set()).add(name)
+
+    def update_modules(self, names: set[str], top_modules: list[str]):
+        '''Updates the DAG after modules in `names` were added, changed or removed.
+
+        Only edges of the given modules are rebuilt. Back edges are recomputed
+        for cycles through these modules and through their old and new children,
+        found among their ancestors, and only instance counts of these modules
+        and their ancestors are dropped.
+        '''
+        self.top_modules = top_modules
+        old_edges = {name: self.edges.get(name, {}) for name in names}
+        for name in names:
+            self._set_edges(name)
+
+        # Modules whose cycle may have changed; a new cycle passes through an
+        # updated module, and children of these got other parents
+        changed = set(names)
+        for name in names:
+            for child in (*old_edges[name], *self.edges.get(name, ())):
+                if child in self._cycles:
+                    changed.add(child)
+        for cycle in {self._cycles[name] for name in changed if name in self._cycles}:
+            self._clear_cycle(cycle)
+            changed |= cycle
+        for name in changed:
+            if name not in self._cycles:
+                cycle = self._cycle_of(name)
+                if cycle:
+                    self._set_cycle(cycle)
+
+        # Modules of new cycles are ancestors of changed modules
+        stale = set(changed)
+        queue = list(changed)
+        while queue:
+            for parent in self._parents.get(queue.pop(), ()):
+                if parent not in stale:
+                    stale.add(parent)
+                    queue.append(parent)
+        for name in stale:
+            self._counts.pop(name, None)
+
+    def set_max_depth(self, max_depth: Optional[int]):
+        if max_depth != self.max_depth:
+            self.max_depth = max_depth
+            self._counts.clear()
+
+    def _find_cycles(self) -> Iterator[frozenset[str]]:
+        '''Yields the cycles of the whole DAG (Tarjan's algorithm).'''
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        for start in self.edges:
+            if start in index:
+                continue
+            index[start] = low[start] = len(index)
+            stack.append(start)
+            on_stack.add(start)
+            path = [(start, iter(self.edges[start]))]
+            while path:
+                name, children = path[-1]
+                for child in children:
+                    if child in on_stack:
+                        low[name] = min(low[name], index[child])
+                    elif child not in index and child in self.edges:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        path.append((child, iter(self.edges[child])))
+                        break
+                else:
+                    path.pop()
+                    if path:
+                        parent = path[-1][0]
+                        low[parent] = min(low[parent], low[name])
+                    if low[name] == index[name]:
+                        cycle = set()
+                        while name not in cycle:
+                            cycle.add(stack.pop())
+                        on_stack -= cycle
+                        if len(cycle) > 1 or name in self.edges[name]:
+                            yield frozenset(cycle)
+
+    def _cycle_of(self, name: str) -> frozenset[str]:
+        '''Returns the cycle through a module, searched among its ancestors; empty if none.'''
+        ancestors = set()
+        queue = [name]
+        while queue:
+            for parent in self._parents.get(queue.pop(), ()):
+                if parent not in ancestors:
+                    ancestors.add(parent)
+                    queue.append(parent)
+        if name not in ancestors:
+            return frozenset()
+        cycle = {name}
+        queue = [name]
+        while queue:
+            for child in self.edges[queue.pop()]:
+                if child in ancestors and child not in cycle:
+                    cycle.add(child)
+                    queue.append(child)
+        return frozenset(cycle)
+
+    def _set_cycle(self, cycle: frozenset[str]):
+        # A new cycle may contain cycles of modules that weren't changed
+        for merged in {self._cycles[name] for name in cycle if name in self._cycles}:
+            self._clear_cycle(merged)
+        for name in cycle:
+            self._cycles[name] = cycle
+        back_edges = self._cycle_back_edges[cycle] = self._find_back_edges(cycle)
+        self.back_edges |= back_edges
+
+    def _clear_cycle(self, cycle: frozenset[str]):
+        for name in cycle:
+            del self._cycles[name]
+        self.back_edges -= self._cycle_back_edges.pop(cycle)
+
+    def _find_back_edges(self, cycle: frozenset[str]) -> set[tuple[str, str]]:
+        entries = [name for name in cycle
+                   if any(parent not in cycle for parent in self._parents.get(name, ()))]
+        start = min(entries or cycle)
+        back_edges = set()
+        visited = {start}
+        on_path = {start}
+        stack = [(start, iter(self.edges[start]))]
+        while stack:
+            parent, children = stack[-1]
+            for child in children:
+                if child in on_path:
+                    back_edges.add((parent, child))
+                elif child in cycle and child not in visited:
+                    visited.add(child)
+                    on_path.add(child)
+                    stack.append((child, iter(self.edges[child])))
+                    break
+            else:
+                on_path.discard(parent)
+                stack.pop()
+        return back_edges
+
+    def children(self, name: str) -> list[tuple[str, int]]:
+        '''Returns instantiated module types with number of instances, excluding back edges.'''
+        return [(child, count) for child, count in self.edges.get(name, {}).items()
+                if (name, child) not in self.back_edges]
+
+    def instance_count(self, name: str, depth: int = 0) -> int:
+        '''Returns number of instances in the instance tree of a module, itself included.
+
+        Args:
+            name: Module name.
+            depth: Depth of the module instance below its top module.
+        '''
+        # Post-order walk of the modules whose count isn't known yet, so that
+        # deep hierarchies don't hit the recursion limit
+        stack = [(name, depth, False)]
+        while stack:
+            module, module_depth, done = stack.pop()
+            if self._known_count(module, module_depth) is not None:
+                continue
+            edges = self.edges[module]
+            if not done:
+                stack.append((module, module_depth, True))
+                stack.extend((child, module_depth + 1, False) for child in edges
+                             if (module, child) not in self.back_edges)
+                continue
+            count = 1
+            for child, multiplicity in edges.items():
+                if (module, child) in self.back_edges:
+                    count += multiplicity
+                else:
+                    count += multiplicity * self._known_count(child, module_depth + 1)
+            self._counts.setdefault(module, {})[module_depth if self.max_depth is not None else 0] = count
+        return self._known_count(name, depth)
+
+    def _known_count(self, name: str, depth: int) -> Optional[int]:
+        '''Returns the instance count of a module if known without computation.'''
+        if name not in self.edges or (self.max_depth is not None and depth >= self.max_depth):
+            return 1
+        return self._counts.get(name, {}).get(depth if self.max_depth is not None else 0)
+
+    def instance_tree(self, name: str) -> _InstanceBase:
+        '''Returns lazily expanded instance tree of a top module.
+
+        Nodes are named after the top module and the instance names given by
+        module_instances().
+        '''
+        if name not in self.modules_info:
+            return UnfoundedInstance(name)
+        module_info = self.modules_info[name]
+        if module_info['instances']['type']:
+            return RootInstance(name, module_info, expand=lambda: self._expand(name, 0))
+        return RootInstance(name, module_info, children=None)
+
+    def _expand(self, name: str, depth: int) -> list[_InstanceBase]:
+        if self.max_depth is not None and depth >= self.max_depth:
+            return []
+        children = []
+        for instance_name, child in module_instances(self.modules_info[name]):
+            if child not in self.modules_info:
+                children.append(UnfoundedInstance(instance_name))
+            elif (name, child) in self.back_edges:
+                children.append(RecursiveInstance(instance_name, self.modules_info[child]))
+            elif self.modules_info[child]['instances']['type']:
+                children.append(BranchInstance(instance_name, self.modules_info[child],
+                    expand=functools.partial(self._expand, child, depth + 1)))
+            else:
+                children.append(LeafInstance(instance_name, self.modules_info[child]))
+        return children
+
+_IDENTIFIER = 'SymbolIdentifier|EscapedIdentifier'
+
+MODULE_QUERY = tree_query.TreeQuery({
+    'name': f'kModuleDeclaration@module > kModuleHeader {_IDENTIFIER}',
+    'ports': f'kModuleDeclaration@module > kModuleHeader kPortDeclaration|kPort@item {_IDENTIFIER}',
+    'parameters': f'kModuleDeclaration@module > kModuleHeader kParamDeclaration@item {_IDENTIFIER}',
+    'imports': 'kModuleDeclaration@module kPackageImportItem',
+    'instance_names': f'kModuleDeclaration@module kGateInstance@item {_IDENTIFIER}',
+    'instance_types': f'kModuleDeclaration@module kInstantiationType@item {_IDENTIFIER}',
+})
+
+# Tags of the subtrees MODULE_QUERY looks into; parsing with these as
+# keep_tags gives the same module information from a much smaller tree
+MODULE_TAGS = frozenset({
+    'kModuleHeader', 'kPackageImportItem', 'kGateInstance', 'kInstantiationType'})
+
+def _level_order(capture: tree_query.Capture) -> tuple[int, int]:
+    return (capture.depth, capture.position)
+
+def _identifiers(matches: list[tree_query.QueryMatch]) -> list[str]:
+    '''Returns text of the first identifier of each captured item.
+
+    Items are ordered, and the first identifier in each of them is chosen, as
+    in a level order search.
+    '''
+    first = {}
+    for match in matches:
+        item = match.captures['item']
+        if item.position not in first or _level_order(match.node) < _level_order(first[item.position][1].node):
+            first[item.position] = (item, match)
+    return [match.node.node.text for item, match in sorted(first.values(), key=lambda m: _level_order(m[0]))]
+
 class AnalysisModuleInfo:
+    '''Design model built from modules of all parsed files.
+
+    Files can be added, replaced and removed later with update_file() and
+    remove_file(). Only modules of that file are re-extracted; the top module
+    set and the cached hierarchy DAG are fixed up incrementally. When several
+    files define a module with the same name, the last added one is used.
+    Top modules are listed in the order of their definitions, by file path,
+    whatever the order in which files were added.
+    '''
     def __init__(self, syntax_data: dict[str, verible_verilog_syntax.SyntaxData]):
         self.modules_info = {}
+        # File path -> modules defined in the file
+        self.files_info = {}
+        # Module name -> names of other modules instantiating it
+        self._parents = {}
+        # Names of modules not instantiated by other modules, used as an
+        # ordered set; _top_module() sorts them
+        self._top_modules = {}
+        self._dag = None
         for file_path, file_data in syntax_data.items():
-            self.modules_info = self.process_file_data(file_path, file_data)
+            self.update_file(file_path, file_data)
+
+    @classmethod
+    def from_files(cls, executable: str, paths: list[str], jobs: int = 1,
+        options: Optional[dict[str, Any]] = None) -> 'AnalysisModuleInfo':
+        '''Parses files and extracts their modules on a pool of processes.
+
+        Paths are split into shards of similar total size. Each worker process
+        parses its shards with `executable` and extracts modules file by file,
+        returning only the module dicts, which are then merged in the order of
+        a serial run.
+
+        Args:
+            executable: Path to verible-verilog-syntax binary.
+            paths: Paths to files to parse.
+            jobs: Number of worker processes. Values lower than 1 use
+                  os.cpu_count().
+            options: Parsing options, as in VeribleVerilogSyntax.parse_files.
+                     Defaults to keeping only MODULE_TAGS subtrees.
+        '''
+        if options is None:
+            options = {'keep_tags': MODULE_TAGS}
+        if jobs < 1:
+            jobs = os.cpu_count() or 1
+        files_info = {}
+        if jobs == 1:
+            files_info = _extract_modules(executable, paths, options)
+        else:
+            # More shards than workers to even out differences in parse time
+            shards = verible_verilog_syntax.VeribleVerilogSyntax._shard_paths(paths, jobs * 4)
+            with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+                for shard_files_info in executor.map(_extract_modules,
+                        [executable] * len(shards), shards, [options] * len(shards)):
+                    files_info.update(shard_files_info)
+
+        analyzer = cls({})
+        for path, modules_info in sorted(files_info.items()):
+            analyzer._replace_file_modules(path, modules_info)
+        return analyzer
+
+    def update_file(self, path: str, data: verible_verilog_syntax.SyntaxData):
+        '''Adds a parsed file or replaces modules of a previously added one.'''
+        self._replace_file_modules(path, self.process_file_data(path, data) or {})
+
+    def remove_file(self, path: str):
+        '''Removes modules of a previously added file.'''
+        self._replace_file_modules(path, {})
+
+    def _replace_file_modules(self, path: str, modules_info: dict[str, dict[str, Any]]):
+        old_modules_info = self.files_info.pop(path, {})
+        if modules_info:
+            self.files_info[path] = modules_info
+
+        changed = set()
+        for name, module_info in old_modules_info.items():
+            if self.modules_info.get(name) is module_info:
+                self._remove_module(name)
+                changed.add(name)
+                if name not in modules_info:
+                    # Fall back to a definition from another file
+                    for other_modules_info in reversed(self.files_info.values()):
+                        if name in other_modules_info:
+                            self._add_module(other_modules_info[name])
+                            break
+        for name, module_info in modules_info.items():
+            if name in self.modules_info:
+                self._remove_module(name)
+            self._add_module(module_info)
+            changed.add(name)
+
+        if self._dag is not None and changed:
+            self._dag.update_modules(changed, self._top_module())
+
+    def _add_module(self, module_info: dict[str, Any]):
+        name = module_info['name']
+        self.modules_info[name] = module_info
+        if not self._parents.get(name):
+            self._top_modules[name] = None
+        for child_name in set(module_info['instances']['type']):
+            if child_name != name:
+                self._parents.setdefault(child_name, set()).add(name)
+                self._top_modules.pop(child_name, None)
+
+    def _remove_module(self, name: str):
+        module_info = self.modules_info.pop(name)
+        self._top_modules.pop(name, None)
+        for child_name in set(module_info['instances']['type']):
+            if child_name != name:
+                parents = self._parents[child_name]
+                parents.discard(name)
+                if not parents:
+                    del self._parents[child_name]
+                    if child_name in self.modules_info:
+                        self._top_modules[child_name] = None
 
     def process_file_data(self, path: str, data: verible_verilog_syntax.SyntaxData) -> dict[str, dict[str, Any]]:
         '''Print information about modules found in SystemVerilog file.
     
-        This function uses verible_verilog_syntax.Node methods to find module
+        This function matches the module selectors of MODULE_QUERY, which are
+        answered from the tag index of the syntax tree, to find module
         declarations and specific tokens containing following information:
 
         * module name
@@ -102,10 +584,22 @@ class AnalysisModuleInfo:
         if not data.tree:
             return
 
+        matches = MODULE_QUERY.run(data.tree)
+
+        # Group matches by module declaration
+        modules = {}
+        for query_name, query_matches in matches.items():
+            for match in query_matches:
+                module = match.captures['module']
+                if module.position not in modules:
+                    modules[module.position] = (module, {name: [] for name in matches})
+                modules[module.position][1][query_name].append(match)
+
         modules_info = {}
 
-        # Collect information about each module declaration in the file
-        for module in data.tree.iter_find_all({'tag': 'kModuleDeclaration'}):
+        # Collect information about each module declaration in the file,
+        # in the level order of the declarations
+        for module, module_matches in sorted(modules.values(), key=lambda m: _level_order(m[0])):
             module_info = {
                 'path': '',
                 'name': '',
@@ -120,97 +614,75 @@ class AnalysisModuleInfo:
 
             module_info['path'] = path
 
-            # Find module header
-            header = module.find({'tag': 'kModuleHeader'})
-            if not header:
+            # Find module name (the first identifier in the header)
+            if not module_matches['name']:
                 continue
-
-            # Find module name
-            name = header.find({'tag': ['SymbolIdentifier', 'EscapedIdentifier']},
-                                iter_=anytree.PreOrderIter)
-            if not name:
-                continue
-            module_info['name'] = name.text
+            module_info['name'] = module_matches['name'][0].node.node.text
 
             # Get the list of ports
-            for port in header.iter_find_all({'tag': ['kPortDeclaration', 'kPort']}):
-                port_id = port.find({'tag': ['SymbolIdentifier', 'EscapedIdentifier']})
-                module_info['ports'].append(port_id.text)
+            module_info['ports'] = _identifiers(module_matches['ports'])
 
             # Get the list of parameters
-            for param in header.iter_find_all({'tag': ['kParamDeclaration']}):
-                param_id = param.find({'tag': ['SymbolIdentifier', 'EscapedIdentifier']})
-                module_info['parameters'].append(param_id.text)
+            module_info['parameters'] = _identifiers(module_matches['parameters'])
 
             # Get the list of imports
-            for pkg in module.iter_find_all({'tag': ['kPackageImportItem']}):
-                module_info['imports'].append(pkg.text)
+            for match in sorted(module_matches['imports'], key=lambda m: _level_order(m.node)):
+                module_info['imports'].append(match.node.node.text)
 
             # Get the list of instances
             #    module_info.instances = {name: [], type: []};
-            for inst in module.iter_find_all({'tag': ['kGateInstance']}):
-                inst_id = inst.find({'tag': ['SymbolIdentifier', 'EscapedIdentifier']})
-                module_info['instances']['name'].append(inst_id.text)
-            for type in module.iter_find_all({'tag': ['kInstantiationType']}):
-                type_id = type.find({'tag': ['SymbolIdentifier', 'EscapedIdentifier']})
-                if not type_id:
-                    continue
-                module_info['instances']['type'].append(type_id.text)
+            module_info['instances']['name'] = _identifiers(module_matches['instance_names'])
+            module_info['instances']['type'] = _identifiers(module_matches['instance_types'])
 
             modules_info[module_info['name']] = module_info
         return modules_info
 
     def _top_module(self) -> list[str]:
-        name = []
-
-        for child_name, child_info in self.modules_info.items():
-            parents_name = []
-            for parent_name, parent_info in self.modules_info.items():
-                if child_name != parent_name:
-                    if (child_name in parent_info['instances']['type']):
-                        parents_name.append(parent_name)
-
-            if len(parents_name) == 0:
-                name.append(child_name)
-        return name
-
-    def _hierarchy(self, top_modules: list[str]) -> dict[str, RootInstance]:
-        def hierarchy(current_name: str) -> Any:
-            if current_name in self.modules_info:
-                current_module = self.modules_info[current_name]
-                if current_module['instances']['type']:
-                    children = [
-                        hierarchy(child)
-                        for child in current_module['instances']['type']
-                    ]
-                    return BranchInstance(current_name, current_module, children=children)
-                else:
-                    return LeafInstance(current_name, current_module)
-            else:
-                return UnfoundedInstance(current_name)
-
-        data = {}
-        for top_module in top_modules:
-            if top_module in self.modules_info:
-                current_module = self.modules_info[top_module]
-                if current_module['instances']['type']:
-                    children = [
-                        hierarchy(child)
-                        for child in current_module['instances']['type']
-                    ]
-                    data[top_module] = RootInstance(top_module, current_module, children)
-                else:
-                    data[top_module] = RootInstance(top_module, current_module, children=None)
-            else:
-                data[top_module] = UnfoundedInstance(top_module)
-        return data
+        # In the order of definitions, by file path and position in the file,
+        # so that it doesn't depend on the order of updates
+        file_orders = {}
+        def definition_order(name):
+            path = self.modules_info[name]['path']
+            if path not in file_orders:
+                file_orders[path] = {name: i for i, name in enumerate(self.files_info.get(path, ()))}
+            return path, file_orders[path].get(name, -1)
+        return sorted(self._top_modules, key=definition_order)
+
+    def _hierarchy(self, top_modules: list[str], max_depth: Optional[int] = None) -> dict[str, RootInstance]:
+        dag = self._get_dag(max_depth)
+        return {top_module: dag.instance_tree(top_module) for top_module in top_modules}
+
+    def _get_dag(self, max_depth: Optional[int] = None) -> ModuleHierarchy:
+        if self._dag is None:
+            self._dag = ModuleHierarchy(self.modules_info, self._top_module(), max_depth)
+        else:
+            self._dag.set_max_depth(max_depth)
+        return self._dag
+
+    def write_database(self, path: str):
+        '''Writes modules to a design database, replacing its content.'''
+        with design_db.DesignDatabase(path) as db:
+            db.write_modules(self.modules_info.values(), clear=True)
 
     def parse_top_module(self) -> list[str]:
         return self._top_module()
 
-    def parse_hierarchy(self) -> dict[str, RootInstance]:
+    def parse_hierarchy(self, max_depth: Optional[int] = None) -> dict[str, RootInstance]:
         top_modules = self._top_module()
-        return self._hierarchy(top_modules)
+        return self._hierarchy(top_modules, max_depth)
+
+    def parse_hierarchy_dag(self, max_depth: Optional[int] = None) -> ModuleHierarchy:
+        return self._get_dag(max_depth)
+
+def _extract_modules(executable: str, paths: list[str],
+    options: Optional[dict[str, Any]] = None) -> dict[str, dict[str, dict[str, Any]]]:
+    '''Parses files and returns modules of each file; run by from_files workers.'''
+    parser = verible_verilog_syntax.VeribleVerilogSyntax(executable=executable)
+    analyzer = AnalysisModuleInfo({})
+    files_info = {}
+    for path, data in parser.iter_parse_files(paths, options):
+        files_info[path] = analyzer.process_file_data(path, data) or {}
+    return files_info
 
 def setting_verible_path() -> str:
     current_dir = pathlib.Path(__file__).resolve().parent.joinpath('..', 'verible')
@@ -228,7 +700,7 @@ def main():
     files = sys.argv[1:]
 
     parser = verible_verilog_syntax.VeribleVerilogSyntax(executable=parser_path)
-    analyzer = AnalysisModuleInfo( parser.parse_files(files) )
+    analyzer = AnalysisModuleInfo( parser.parse_files(files, {'keep_tags': MODULE_TAGS}) )
     data = analyzer.parse_hierarchy()
     for instance_name, instance_data in data.items():
         instance_data.RenderTree()
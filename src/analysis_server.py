@@ -0,0 +1,169 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Serve module analysis of SystemVerilog sources over a Unix domain socket.
+
+Usage: analysis_server.py [--socket PATH] [--interval SECONDS] PATH [PATH [...]]
+
+Parses the sources once and keeps the module model resident, so queries
+sent by analysis_client.py don't pay interpreter startup or parsing. The
+sources are watched with DesignWatcher and changed files are reparsed in
+the background.
+
+Each connection carries one request, a JSON object line with a 'command'
+key, and its response: a status line ('ok' or 'error MESSAGE') followed by
+output lines. Commands:
+
+* top:        top module names, one per line
+* hierarchy:  hierarchy as printed by analysis_module_info.py; optional
+              'top' (module name) and 'max_depth' keys
+* module:     module information of module 'name' as JSON
+* stop:       stops the server
+'''
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from typing import Any
+
+import analysis_client
+import analysis_module_info
+import design_watcher
+import verible_verilog_syntax
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    # Buffer output; it is flushed when the handler finishes
+    wbufsize = 1 << 16
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            lines = self.server.query(request)
+        except (ValueError, KeyError, TypeError) as e:
+            self.wfile.write(f'error {e}\n'.encode('utf-8'))
+            return
+        self.wfile.write(b'ok\n')
+        for line in lines:
+            self.wfile.write(line.encode('utf-8') + b'\n')
+        if request['command'] == 'stop':
+            self.wfile.flush()
+            # shutdown() waits for serve_forever() to return; call it from another thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+class AnalysisServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    '''Unix domain socket server answering queries about a watched design.
+
+    Queries and model updates are serialized with a lock, so a query never
+    sees a partially updated model; responses are written without the lock.
+
+    Args:
+        socket_path: Path of the socket; a stale socket file is replaced.
+        watcher: Watcher holding the module model.
+        interval: Polling interval of the watcher in seconds.
+    '''
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, watcher: design_watcher.DesignWatcher, interval: float = 0.2):
+        self.watcher = watcher
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        if os.path.exists(socket_path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                if sock.connect_ex(socket_path) == 0:
+                    raise OSError(f'Server already running on {socket_path}')
+            os.unlink(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        '''Serves requests and watches sources until shutdown() is called.'''
+        self._stop.clear()
+        watch_thread = threading.Thread(target=self._watch, daemon=True)
+        watch_thread.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self._stop.set()
+            watch_thread.join()
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                self.watcher.poll()
+
+    def query(self, request: dict[str, Any]) -> list[str]:
+        '''Validates a request and returns the response lines.
+
+        The response is built while holding the model lock, and written to the
+        client after releasing it, so a slow client doesn't block updates.
+
+        Raises:
+            ValueError: for unknown commands and modules.
+        '''
+        command = request['command']
+        if command == 'stop':
+            return []
+        with self._lock:
+            return self._answer(command, request)
+
+    def _answer(self, command: str, request: dict[str, Any]) -> list[str]:
+        analyzer = self.watcher.analyzer
+        if command == 'top':
+            return analyzer.parse_top_module()
+        if command == 'hierarchy':
+            top = request.get('top')
+            if top is not None and top not in analyzer.modules_info:
+                raise ValueError(f'Unknown module: {top}')
+            top_modules = [top] if top is not None else analyzer.parse_top_module()
+            lines = []
+            for root in analyzer._hierarchy(top_modules, request.get('max_depth')).values():
+                lines.extend(root.render_lines())
+            return lines
+        if command == 'module':
+            name = request['name']
+            if name not in analyzer.modules_info:
+                raise ValueError(f'Unknown module: {name}')
+            return json.dumps(analyzer.modules_info[name], indent=4).splitlines()
+        raise ValueError(f'Unknown command: {command}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve module analysis over a Unix domain socket.')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='source file or directory')
+    parser.add_argument('--socket', default=analysis_client.DEFAULT_SOCKET, help='socket path')
+    parser.add_argument('--interval', type=float, default=0.2, help='polling interval in seconds')
+    args = parser.parse_args()
+
+    syntax_parser = verible_verilog_syntax.VeribleVerilogSyntax(
+        executable=analysis_module_info.setting_verible_path())
+    watcher = design_watcher.DesignWatcher(syntax_parser, args.paths)
+    with AnalysisServer(args.socket, watcher, args.interval) as server:
+        print(f'Serving {len(watcher.analyzer.modules_info)} modules on {args.socket}', flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
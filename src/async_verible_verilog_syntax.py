@@ -0,0 +1,135 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""asyncio wrapper for ``verible-verilog-syntax --export_json``"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import subprocess
+import weakref
+from typing import Any, Dict, List, Optional
+
+from verible_verilog_syntax import SyntaxData, VeribleVerilogSyntax
+
+
+class AsyncVeribleVerilogSyntax:
+  """``verible-verilog-syntax`` wrapper with asyncio coroutines.
+
+  The parser runs in a subprocess created with
+  ``asyncio.create_subprocess_exec``. Decoding its output and building
+  SyntaxData runs in an executor, so the event loop is not blocked.
+  Cancelling a coroutine kills its parser process. The same instance can
+  be used from several event loops; ``max_concurrency`` applies to each
+  loop separately.
+
+  Args:
+    executable: path to ``verible-verilog-syntax`` binary.
+    max_concurrency: maximum number of parser processes running at once.
+      Defaults to ``os.cpu_count()``.
+    executor: executor used for decoding parser output. Defaults to the
+      event loop's default executor.
+  """
+
+  def __init__(self, executable: str = "verible-verilog-syntax",
+               max_concurrency: Optional[int] = None,
+               executor: Optional[concurrent.futures.Executor] = None):
+    self.executable = executable
+    self.max_concurrency = max_concurrency or os.cpu_count() or 1
+    self.executor = executor
+    # Event loop -> semaphore; a semaphore can only be used from its loop
+    self._semaphores = weakref.WeakKeyDictionary()
+
+  async def _parse(self, paths: List[str], input_: str = None,
+                   options: Dict[str, Any] = None) -> Dict[str, SyntaxData]:
+    """Common implementation of parse_* methods"""
+    options = VeribleVerilogSyntax._with_default_options(options)
+    args = VeribleVerilogSyntax._parser_args(options)
+
+    loop = asyncio.get_running_loop()
+    semaphore = self._semaphores.get(loop)
+    if semaphore is None:
+      semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+
+    async with semaphore:
+      proc = await asyncio.create_subprocess_exec(
+          self.executable, *args, *paths,
+          stdin=subprocess.PIPE if input_ is not None else subprocess.DEVNULL,
+          stdout=subprocess.PIPE)
+      try:
+        stdout, _ = await proc.communicate(
+            input_.encode("utf-8") if input_ is not None else None)
+      finally:
+        if proc.returncode is None:
+          proc.kill()
+          await proc.wait()
+
+    return await loop.run_in_executor(
+        self.executor, AsyncVeribleVerilogSyntax._transform_output,
+        stdout, input_, options)
+
+  @staticmethod
+  def _transform_output(stdout: bytes, input_: Optional[str],
+                        options: Dict[str, Any]) -> Dict[str, SyntaxData]:
+    json_data = json.loads(stdout)
+    return {
+      file_path: VeribleVerilogSyntax._transform_file(file_path, file_json,
+                                                      input_, options)
+      for file_path, file_json in json_data.items()
+    }
+
+  async def parse_files(self, paths: List[str],
+                        options: Dict[str, Any] = None) \
+                        -> Dict[str, SyntaxData]:
+    """Parse multiple SystemVerilog files.
+
+    Args:
+      paths: list of paths to files to parse.
+      options: dict with parsing options, as in
+        ``VeribleVerilogSyntax.parse_files``.
+
+    Returns:
+      A dict that maps file names to their parsing results in SyntaxData object.
+    """
+    return await self._parse(paths, options = options)
+
+  async def parse_file(self, path: str, options: Dict[str, Any] = None) \
+                       -> Optional[SyntaxData]:
+    """Parse single SystemVerilog file.
+
+    Args:
+      path: path to a file to parse.
+      options: dict with parsing options, as in
+        ``VeribleVerilogSyntax.parse_file``.
+
+    Returns:
+      Parsing results in SyntaxData object.
+    """
+    return (await self._parse([path], options = options)).get(path, None)
+
+  async def parse_string(self, string: str, options: Dict[str, Any] = None) \
+                         -> Optional[SyntaxData]:
+    """Parse a string with SystemVerilog code.
+
+    Args:
+      string: SystemVerilog code to parse.
+      options: dict with parsing options, as in
+        ``VeribleVerilogSyntax.parse_string``.
+
+    Returns:
+      Parsing results in SyntaxData object.
+    """
+    return (await self._parse(["-"], input_=string,
+                              options=options)).get("-", None)
@@ -0,0 +1,211 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Benchmark parsing and module analysis on a synthetic design.
+
+Usage: benchmark.py [--files N] [--modules N] [--depth N] [--fanout N]
+                    [--ports N] [--memory] [--save FILE] [--compare FILE]
+
+Generates a SystemVerilog design, then measures each stage separately:
+
+* subprocess:     running verible-verilog-syntax --export_json -printtree
+* json:           json.loads of its output
+* transform_tree: VeribleVerilogSyntax._transform_tree
+* parse:          VeribleVerilogSyntax.parse_files, end to end
+* query:          iter_find_all of module declarations and Node.text
+* iterate:        full pre-order, post-order and level-order traversals
+* process_file:   AnalysisModuleInfo.process_file_data of all files
+* hierarchy:      AnalysisModuleInfo.parse_hierarchy, fully expanded
+
+For each stage wall time, files/s and syntax tree nodes/s are reported, and
+with --memory also the peak memory allocated during the stage (tracemalloc;
+this slows stages down). Results can be saved as a JSON baseline and
+compared against later runs.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+import analysis_module_info
+import verible_verilog_syntax
+
+def generate_design(directory: str, files: int = 10, modules: int = 100, depth: int = 4,
+    fanout: int = 3, ports: int = 4) -> list[str]:
+    '''Writes a synthetic design and returns paths of its files.
+
+    Modules are spread evenly over `depth` hierarchy levels. Each module
+    instantiates `fanout` modules of the next level; modules of the last level
+    contain only logic. Modules are assigned to files round-robin.
+
+    Args:
+        directory: Output directory.
+        files: Number of files.
+        modules: Number of modules.
+        depth: Number of hierarchy levels.
+        fanout: Number of instances in each non-leaf module.
+        ports: Number of input ports of each module.
+    '''
+    depth = max(1, min(depth, modules))
+    levels = [[] for _ in range(depth)]
+    for i in range(modules):
+        levels[i * depth // modules].append(f'mod_{i}')
+
+    sources = [[] for _ in range(max(1, files))]
+    count = 0
+    for level, names in enumerate(levels):
+        children = levels[level + 1] if level + 1 < depth else []
+        for i, name in enumerate(names):
+            inputs = [f'in_{p}' for p in range(ports)]
+            lines = [f'module {name} #(parameter int WIDTH = 8) (']
+            lines += [f'  input  logic [WIDTH-1:0] {port},' for port in inputs]
+            lines += ['  output logic [WIDTH-1:0] out', ');']
+            lines += ['  import pkg::*;', f'  logic [WIDTH-1:0] sum;']
+            expression = ' ^ '.join(inputs) if inputs else "'0"
+            lines += [f'  assign sum = {expression};']
+            for f in range(fanout if children else 0):
+                child = children[(i * fanout + f) % len(children)]
+                connections = ', '.join(f'.{port}(sum)' for port in inputs)
+                lines += [f'  {child} #(.WIDTH(WIDTH)) u_{f} ({connections}, .out());']
+            lines += ['  always_comb begin', '    out = sum;', '  end', 'endmodule', '']
+            sources[count % len(sources)].append('\n'.join(lines))
+            count += 1
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, source in enumerate(sources):
+        path = os.path.join(directory, f'design_{i}.sv')
+        with open(path, 'w') as f:
+            f.write('\n'.join(source))
+        paths.append(path)
+    return paths
+
+def _measure(function: Callable[[], Any], memory: bool) -> tuple[Any, float, Optional[int]]:
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+def run_benchmark(executable: str, paths: list[str], memory: bool = False) -> dict[str, dict[str, Any]]:
+    '''Runs all stages and returns their statistics.'''
+    parser = verible_verilog_syntax.VeribleVerilogSyntax(executable=executable)
+    stages = {}
+
+    def record(name, function):
+        result, seconds, peak = _measure(function, memory)
+        stages[name] = {'seconds': seconds, 'peak_bytes': peak}
+        return result
+
+    stdout = record('subprocess', lambda: subprocess.run(
+        [executable, '-export_json', '-printtree', *paths],
+        stdout=subprocess.PIPE, encoding='utf-8', check=False).stdout)
+    json_data = record('json', lambda: json.loads(stdout))
+    del stdout
+    trees = record('transform_tree', lambda: [
+        verible_verilog_syntax.VeribleVerilogSyntax._transform_tree(
+            file_json.get('tree'), verible_verilog_syntax.SyntaxData(), False)
+        for file_json in json_data.values()])
+    nodes = sum(len(tree.descendants) + 1 for tree in trees if tree)
+    del json_data, trees
+
+    data = record('parse', lambda: parser.parse_files(paths))
+    record('query', lambda: [
+        module.text
+        for file_data in data.values()
+        for module in file_data.tree.iter_find_all({'tag': 'kModuleDeclaration'})])
+    record('iterate', lambda: [
+        sum(1 for _ in iterator(file_data.tree))
+        for file_data in data.values()
+        for iterator in (verible_verilog_syntax.PreOrderTreeIterator,
+                         verible_verilog_syntax.PostOrderTreeIterator,
+                         verible_verilog_syntax.LevelOrderTreeIterator)])
+    analyzer = record('process_file', lambda: analysis_module_info.AnalysisModuleInfo(data))
+    record('hierarchy', lambda: sum(
+        len(root.descendants) + 1 for root in analyzer.parse_hierarchy().values()))
+
+    for stats in stages.values():
+        seconds = stats['seconds'] or float('inf')
+        stats['files_per_s'] = len(paths) / seconds
+        stats['nodes_per_s'] = nodes / seconds
+    return stages
+
+def print_stages(stages: dict[str, dict[str, Any]], baseline: Optional[dict[str, dict[str, Any]]] = None):
+    header = f'{"stage":<16}{"seconds":>10}{"files/s":>12}{"nodes/s":>14}{"peak MiB":>10}'
+    if baseline:
+        header += f'{"vs base":>10}'
+    print(header)
+    for name, stats in stages.items():
+        peak = f'{stats["peak_bytes"] / (1 << 20):.1f}' if stats['peak_bytes'] is not None else '-'
+        line = f'{name:<16}{stats["seconds"]:>10.3f}{stats["files_per_s"]:>12.1f}' \
+               f'{stats["nodes_per_s"]:>14.0f}{peak:>10}'
+        if baseline and name in baseline:
+            line += f'{stats["seconds"] / baseline[name]["seconds"]:>9.2f}x'
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parsing and module analysis.')
+    parser.add_argument('--verible', default=analysis_module_info.setting_verible_path(),
+                        help='path to verible-verilog-syntax (default: bundled binary)')
+    parser.add_argument('--files', type=int, default=10, help='number of files')
+    parser.add_argument('--modules', type=int, default=200, help='number of modules')
+    parser.add_argument('--depth', type=int, default=4, help='number of hierarchy levels')
+    parser.add_argument('--fanout', type=int, default=3, help='instances per non-leaf module')
+    parser.add_argument('--ports', type=int, default=4, help='input ports per module')
+    parser.add_argument('--output-dir', help='keep the generated design in this directory')
+    parser.add_argument('--memory', action='store_true', help='measure peak memory of each stage')
+    parser.add_argument('--save', metavar='FILE', help='save results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as a regression by --compare (default: 1.2)')
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in ('files', 'modules', 'depth', 'fanout', 'ports')}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = generate_design(args.output_dir or tmp_dir, **config)
+        stages = run_benchmark(args.verible, paths, args.memory)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            print(f'Warning: baseline was run with {baseline["config"]}')
+        baseline = baseline['stages']
+    print_stages(stages, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'config': config, 'stages': stages}, f, indent=2)
+
+    if baseline:
+        regressions = [name for name, stats in stages.items()
+                       if name in baseline and stats['seconds'] > baseline[name]['seconds'] * args.threshold]
+        if regressions:
+            print(f'Regressions: {", ".join(regressions)}')
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Single-file SQLite database of module information.
+
+Replaces one JSON file per module. Written by
+AnalysisModuleInfo.write_database() and queried through
+ModuleInfo.set_module_info(database=...).
+
+Module information is returned in the dict format of AnalysisModuleInfo,
+with an additional 'file' key holding the same value as 'path':
+
+    {
+        'file': str, 'path': str, 'name': str,
+        'ports': [str], 'parameters': [str], 'imports': [str],
+        'instances': {'name': [str], 'type': [str]}
+    }
+'''
+import json
+import sqlite3
+from typing import Any, Iterable, Iterator, Optional
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS modules (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    ports TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    imports TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instance_names (
+    module TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (module, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS instance_types (
+    module TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    PRIMARY KEY (module, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS instance_types_type ON instance_types (type);
+'''
+
+class DesignDatabase:
+    '''Indexed on-disk store of module information.
+
+    Modules are looked up by name through the primary key, and parents of a
+    module through an index on instance types, so queries don't load or
+    decode other modules.
+
+    Args:
+        path: Database file; created if it doesn't exist.
+    '''
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'DesignDatabase':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_modules(self, modules_info: Iterable[dict[str, Any]], clear: bool = False):
+        '''Stores modules, replacing stored modules with the same names.
+
+        Args:
+            modules_info: Module information dicts.
+            clear: Whether to remove all stored modules first; names in
+                   `modules_info` must then be unique.
+        '''
+        with self.connection:
+            if clear:
+                for table in ('modules', 'instance_names', 'instance_types'):
+                    self.connection.execute(f'DELETE FROM {table}')
+            for module_info in modules_info:
+                name = module_info['name']
+                if not clear:
+                    self._delete(name)
+                self.connection.execute(
+                    'INSERT INTO modules VALUES (?, ?, ?, ?, ?)',
+                    (name, module_info.get('path', module_info.get('file', '')),
+                     json.dumps(module_info.get('ports', [])),
+                     json.dumps(module_info.get('parameters', [])),
+                     json.dumps(module_info.get('imports', []))))
+                self.connection.executemany(
+                    'INSERT INTO instance_names VALUES (?, ?, ?)',
+                    [(name, i, n) for i, n in enumerate(module_info['instances']['name'])])
+                self.connection.executemany(
+                    'INSERT INTO instance_types VALUES (?, ?, ?)',
+                    [(name, i, t) for i, t in enumerate(module_info['instances']['type'])])
+
+    def remove_modules(self, names: Iterable[str]):
+        with self.connection:
+            for name in names:
+                self._delete(name)
+
+    def _delete(self, name: str):
+        for table, column in (('modules', 'name'), ('instance_names', 'module'),
+                              ('instance_types', 'module')):
+            self.connection.execute(f'DELETE FROM {table} WHERE {column} = ?', (name,))
+
+    def get_names(self) -> list[str]:
+        return [name for name, in self.connection.execute('SELECT name FROM modules ORDER BY rowid')]
+
+    def get_module_info(self, name: str) -> Optional[dict[str, Any]]:
+        row = self.connection.execute(
+            'SELECT name, path, ports, parameters, imports FROM modules WHERE name = ?',
+            (name,)).fetchone()
+        if row is None:
+            return None
+        module_info = self._module_info(row)
+        module_info['instances']['name'] = [n for n, in self.connection.execute(
+            'SELECT name FROM instance_names WHERE module = ? ORDER BY position', (name,))]
+        module_info['instances']['type'] = [t for t, in self.connection.execute(
+            'SELECT type FROM instance_types WHERE module = ? ORDER BY position', (name,))]
+        return module_info
+
+    def iter_module_info(self) -> Iterator[dict[str, Any]]:
+        '''Yields all modules, using one query per table.'''
+        instance_names = {}
+        for module, name in self.connection.execute(
+                'SELECT module, name FROM instance_names ORDER BY module, position'):
+            instance_names.setdefault(module, []).append(name)
+        instance_types = {}
+        for module, type_ in self.connection.execute(
+                'SELECT module, type FROM instance_types ORDER BY module, position'):
+            instance_types.setdefault(module, []).append(type_)
+
+        for row in self.connection.execute(
+                'SELECT name, path, ports, parameters, imports FROM modules ORDER BY rowid'):
+            module_info = self._module_info(row)
+            module_info['instances']['name'] = instance_names.get(row[0], [])
+            module_info['instances']['type'] = instance_types.get(row[0], [])
+            yield module_info
+
+    def search_parent(self, child_name: str) -> list[str]:
+        '''Returns names of modules instantiating a module.'''
+        return [name for name, in self.connection.execute(
+            'SELECT name FROM modules WHERE name IN '
+            '(SELECT module FROM instance_types WHERE type = ?) ORDER BY rowid', (child_name,))]
+
+    def search_top_module(self) -> list[str]:
+        '''Returns names of modules not instantiated by any module.'''
+        return [name for name, in self.connection.execute(
+            'SELECT name FROM modules WHERE name NOT IN (SELECT type FROM instance_types) '
+            'ORDER BY rowid')]
+
+    @staticmethod
+    def _module_info(row: tuple) -> dict[str, Any]:
+        name, path, ports, parameters, imports = row
+        return {
+            'file': path,
+            'path': path,
+            'name': name,
+            'ports': json.loads(ports),
+            'parameters': json.loads(parameters),
+            'imports': json.loads(imports),
+            'instances': {
+                'name': [],
+                'type': []
+            }
+        }
@@ -0,0 +1,228 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Watch SystemVerilog sources and keep module analysis up to date.
+
+Usage: design_watcher.py [--interval SECONDS] [--hierarchy] PATH [PATH [...]]
+
+PATH is a source file or a directory searched recursively for files with
+SystemVerilog extensions. All files are parsed once, then the sources are
+polled: only files whose modification time or size changed, and whose
+content hash differs, are reparsed, and the module model is updated with
+AnalysisModuleInfo.update_file() / remove_file(). Each change is printed
+as an event; with --hierarchy the hierarchy is printed again after it.
+'''
+import argparse
+import dataclasses
+import hashlib
+import os
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+import analysis_module_info
+import verible_verilog_syntax
+
+EXTENSIONS = ('.sv', '.svh', '.v', '.vh')
+
+@dataclasses.dataclass
+class ChangeEvent:
+    '''Change of the design found by a poll.
+
+    Attributes:
+        kind: 'added', 'modified' or 'removed' for a source file;
+              'top_modules' when the set of top modules changed.
+        path: Source file path; empty for 'top_modules' events.
+        modules: Modules defined in the file (before removal for 'removed'),
+                 or the new top modules.
+        elapsed: Seconds from detecting the change to the updated model.
+    '''
+    kind: str
+    path: str
+    modules: list[str]
+    elapsed: float = 0.0
+
+class DesignWatcher:
+    '''Polls source files and incrementally updates an AnalysisModuleInfo.
+
+    Files are compared by modification time and size first; the content hash
+    is computed only for files whose stat changed, so touching a file without
+    modifying it doesn't cause a reparse. All changed files of a poll are
+    parsed with a single parser invocation.
+
+    Args:
+        parser: Parser used to reparse changed files.
+        paths: Source files and directories to watch.
+        analyzer: Module model of the current sources. If None, all files are
+                  parsed and a new model is built.
+        callback: Called with each ChangeEvent.
+        extensions: File extensions searched for in directories.
+        options: Parsing options, as in VeribleVerilogSyntax.parse_files.
+                 Defaults to keeping only analysis_module_info.MODULE_TAGS
+                 subtrees.
+    '''
+    def __init__(self, parser: verible_verilog_syntax.VeribleVerilogSyntax, paths: list[str],
+        analyzer: Optional[analysis_module_info.AnalysisModuleInfo] = None,
+        callback: Optional[Callable[[ChangeEvent], None]] = None,
+        extensions: tuple[str, ...] = EXTENSIONS, options: Optional[dict] = None):
+        self.parser = parser
+        self.paths = list(paths)
+        self.callback = callback
+        self.extensions = extensions
+        self.options = options if options is not None else {'keep_tags': analysis_module_info.MODULE_TAGS}
+        # File path -> (mtime_ns, size, content hash)
+        self._files = {}
+        self._stop = threading.Event()
+
+        stats = self._scan()
+        for path, stat in stats.items():
+            self._files[path] = (*stat, self._hash(path))
+        if analyzer is None:
+            analyzer = analysis_module_info.AnalysisModuleInfo(
+                parser.parse_files(sorted(stats), self.options) if stats else {})
+        self.analyzer = analyzer
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        '''Returns (mtime_ns, size) of all watched files.'''
+        stats = {}
+        stack = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                stack.append(path)
+            else:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stats[path] = (st.st_mtime_ns, st.st_size)
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                        elif entry.name.endswith(self.extensions):
+                            st = entry.stat()
+                            stats[entry.path] = (st.st_mtime_ns, st.st_size)
+                    except OSError:
+                        continue
+        return stats
+
+    @staticmethod
+    def _hash(path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).digest()
+        except OSError:
+            return None
+
+    def poll(self) -> list[ChangeEvent]:
+        '''Checks sources once, updates the model and returns the changes.'''
+        stats = self._scan()
+        start = time.perf_counter()
+        changed = []
+        for path, stat in stats.items():
+            old = self._files.get(path)
+            if old is not None and old[:2] == stat:
+                continue
+            digest = self._hash(path)
+            self._files[path] = (*stat, digest)
+            if old is None or old[2] != digest:
+                changed.append((path, 'added' if old is None else 'modified'))
+        removed = [path for path in self._files if path not in stats]
+        if not changed and not removed:
+            return []
+
+        top_modules = self.analyzer.parse_top_module()
+        modules = {}
+        data = self.parser.parse_files(sorted(path for path, _ in changed), self.options) \
+            if changed else {}
+        # Files which couldn't be read by the parser, e.g. deleted since
+        # the scan, are removed; they are added again once readable
+        vanished = [(path, kind) for path, kind in changed if path not in data]
+        changed = [(path, kind) for path, kind in changed if path in data]
+        for path, kind in vanished:
+            if kind == 'modified':
+                removed.append(path)
+            else:
+                del self._files[path]
+        for path in removed:
+            del self._files[path]
+            modules[path] = list(self.analyzer.files_info.get(path, {}))
+            self.analyzer.remove_file(path)
+        for path, _ in changed:
+            self.analyzer.update_file(path, data[path])
+            modules[path] = list(self.analyzer.files_info.get(path, {}))
+        elapsed = time.perf_counter() - start
+
+        events = [ChangeEvent(kind, path, modules[path], elapsed) for path, kind in changed]
+        events += [ChangeEvent('removed', path, modules[path], elapsed) for path in removed]
+        new_top_modules = self.analyzer.parse_top_module()
+        if set(new_top_modules) != set(top_modules):
+            events.append(ChangeEvent('top_modules', '', new_top_modules, elapsed))
+        if self.callback is not None:
+            for event in events:
+                self.callback(event)
+        return events
+
+    def run(self, interval: float = 0.2,
+            on_change: Optional[Callable[[list[ChangeEvent]], None]] = None):
+        '''Polls every `interval` seconds until stop() is called.
+
+        `on_change` is called with the events of each poll which found changes,
+        after `callback` has been called with each of them.
+        '''
+        self._stop.clear()
+        while not self._stop.wait(interval):
+            events = self.poll()
+            if events and on_change is not None:
+                on_change(events)
+
+    def stop(self):
+        self._stop.set()
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch SystemVerilog sources and update module analysis.')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='source file or directory')
+    parser.add_argument('--interval', type=float, default=0.2, help='polling interval in seconds')
+    parser.add_argument('--hierarchy', action='store_true', help='print the hierarchy after each change')
+    args = parser.parse_args()
+
+    syntax_parser = verible_verilog_syntax.VeribleVerilogSyntax(
+        executable=analysis_module_info.setting_verible_path())
+
+    def print_hierarchy(events=None):
+        for instance_data in watcher.analyzer.parse_hierarchy().values():
+            instance_data.RenderTree()
+
+    def print_event(event: ChangeEvent):
+        target = event.path or 'design'
+        print(f'{event.kind} {target}: {", ".join(event.modules)} ({event.elapsed * 1000:.1f} ms)', flush=True)
+
+    watcher = DesignWatcher(syntax_parser, args.paths, callback=print_event)
+    if args.hierarchy:
+        print_hierarchy()
+    try:
+        watcher.run(args.interval, print_hierarchy if args.hierarchy else None)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+'''Export the instance hierarchy as JSON lines, Graphviz DOT or CSV.
+
+Usage: hierarchy_export.py [--format jsonl|dot|csv] [--output FILE]
+                           [--top MODULE] [--max-depth N] [--match PATTERN]
+                           VERILOG_FILE [VERILOG_FILE [...]]
+
+Instances are generated one at a time in a depth-first walk of the module
+model and written as they are visited, without building an instance tree,
+so output starts immediately and memory use depends only on the hierarchy
+depth. Each instance is exported with:
+
+* path:   hierarchical instance path, e.g. top.u_core.u_alu; escaped
+          identifiers are terminated by a space, as in SystemVerilog
+          (top.\\u.x .u_alu), so paths can be split unambiguously
+* name:   instance name, the last component of the path
+* module: module type
+* file:   file defining the module; empty if the module wasn't found
+* depth:  instance depth below the top module
+* kind:   'top', 'instance', 'unfounded' (module not found) or 'recursive'
+          (instance closing a cycle; not expanded)
+
+Instances are named as in the instance trees of analysis_module_info (see
+module_instances()): when names can't be paired with types, e.g. because
+one instantiation declares several instances, the module type is used as
+the name, with ``#N`` appended to its N-th use in the same module, so that
+paths stay unique.
+'''
+import argparse
+import csv
+import fnmatch
+import json
+import sys
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, TextIO
+
+import analysis_module_info
+import verible_verilog_syntax
+
+class InstanceRecord(NamedTuple):
+    path: str
+    name: str
+    module: str
+    file: str
+    depth: int
+    kind: str
+
+def _component(name: str) -> str:
+    '''Returns a name as a path component, terminating escaped identifiers.'''
+    return name + ' ' if name.startswith('\\') else name
+
+def iter_instances(analyzer: analysis_module_info.AnalysisModuleInfo,
+    top_modules: Optional[list[str]] = None, max_depth: Optional[int] = None,
+    filter_: Optional[Callable[[InstanceRecord], bool]] = None) -> Iterator[InstanceRecord]:
+    '''Yields instances of the hierarchy in pre-order.
+
+    Args:
+        analyzer: Module model.
+        top_modules: Top modules to start from; all top modules if None.
+        max_depth: Maximum instance depth; None for no limit.
+        filter_: Instances for which it returns False are not yielded; their
+                 subtrees are still visited.
+    '''
+    modules_info = analyzer.modules_info
+    back_edges = analyzer.parse_hierarchy_dag(max_depth).back_edges
+    if top_modules is None:
+        top_modules = analyzer.parse_top_module()
+
+    for top in top_modules:
+        module_info = modules_info.get(top)
+        record = InstanceRecord(_component(top), top, top, module_info['path'] if module_info else '', 0,
+                                'top' if module_info else 'unfounded')
+        if filter_ is None or filter_(record):
+            yield record
+        if module_info is None or (max_depth is not None and max_depth <= 0):
+            continue
+
+        # Stack of (instance path, module name, depth, iterator over instances)
+        stack = [(record.path, top, 0, analysis_module_info.module_instances(module_info))]
+        while stack:
+            path, name, depth, instances = stack[-1]
+            for instance_name, child in instances:
+                child_info = modules_info.get(child)
+                if child_info is None:
+                    kind = 'unfounded'
+                elif (name, child) in back_edges:
+                    kind = 'recursive'
+                else:
+                    kind = 'instance'
+                record = InstanceRecord(f'{path}.{_component(instance_name)}', instance_name, child,
+                                        child_info['path'] if child_info else '', depth + 1, kind)
+                if filter_ is None or filter_(record):
+                    yield record
+                if kind == 'instance' and child_info['instances']['type'] \
+                        and (max_depth is None or depth + 1 < max_depth):
+                    stack.append((record.path, child, depth + 1,
+                                  analysis_module_info.module_instances(child_info)))
+                    break
+            else:
+                stack.pop()
+
+def write_jsonl(records: Iterable[InstanceRecord], output: TextIO):
+    '''Writes one JSON object per instance.'''
+    dumps = json.dumps
+    for record in records:
+        output.write(dumps(record._asdict()) + '\n')
+
+def write_csv(records: Iterable[InstanceRecord], output: TextIO):
+    '''Writes a CSV table with a header row.'''
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(InstanceRecord._fields)
+    writer.writerows(records)
+
+def write_dot(records: Iterable[InstanceRecord], output: TextIO):
+    '''Writes a Graphviz digraph with a node per instance.
+
+    Each instance is connected to its closest written ancestor, so instances
+    left out by a filter are skipped over. Records come in pre-order, so the
+    written records that are ancestors of the current one form a stack; an
+    entry is an ancestor if it is less deep and its path is a prefix of the
+    current path, which is exact since escaped identifiers are terminated.
+    '''
+    dumps = json.dumps
+    # (depth, path) of written ancestors of the current record
+    ancestors = []
+    output.write('digraph hierarchy {\n  node [shape=box];\n')
+    for record in records:
+        while ancestors and (ancestors[-1][0] >= record.depth
+                             or not record.path.startswith(ancestors[-1][1] + '.')):
+            ancestors.pop()
+        path = dumps(record.path)
+        label = record.name + '\n' + record.module
+        output.write(f'  {path} [label={dumps(label)}];\n')
+        if ancestors:
+            output.write(f'  {dumps(ancestors[-1][1])} -> {path};\n')
+        ancestors.append((record.depth, record.path))
+    output.write('}\n')
+
+WRITERS = {
+    'jsonl': write_jsonl,
+    'csv': write_csv,
+    'dot': write_dot,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the instance hierarchy.')
+    parser.add_argument('files', nargs='+', metavar='VERILOG_FILE', help='SystemVerilog source file')
+    parser.add_argument('--format', choices=WRITERS, default='jsonl', help='output format (default: jsonl)')
+    parser.add_argument('--output', help='output file (default: stdout)')
+    parser.add_argument('--top', action='append', help='top module; may be repeated (default: all top modules)')
+    parser.add_argument('--max-depth', type=int, help='maximum instance depth')
+    parser.add_argument('--match', metavar='PATTERN',
+                        help='export only instances whose path or module matches this glob pattern')
+    args = parser.parse_args()
+
+    syntax_parser = verible_verilog_syntax.VeribleVerilogSyntax(
+        executable=analysis_module_info.setting_verible_path())
+    analyzer = analysis_module_info.AnalysisModuleInfo(
+        syntax_parser.parse_files(args.files, {'keep_tags': analysis_module_info.MODULE_TAGS}))
+
+    filter_ = None
+    if args.match:
+        filter_ = lambda record: fnmatch.fnmatchcase(record.path, args.match) \
+            or fnmatch.fnmatchcase(record.module, args.match)
+    records = iter_instances(analyzer, args.top, args.max_depth, filter_)
+
+    if args.output:
+        with open(args.output, 'w', buffering=1 << 20) as output:
+            WRITERS[args.format](records, output)
+    else:
+        WRITERS[args.format](records, sys.stdout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,7 @@ import sys
 import json
 from typing import Optional
 
+from design_db import DesignDatabase
 from logger import Logger
 
 class ModuleInfo:
@@ -12,8 +13,16 @@ class ModuleInfo:
     #            instances: Optional[dict[str, str]] = None):
     def __init__(self, module_info: Optional[list[dict[str, str]]] = None):
         self.list_of_module_info = []
+        # Indexes maintained by _add_module_info:
+        #   module name -> first module_info with that name
+        #   instance type -> module_info of modules instantiating it
+        self.module_info_by_name = {}
+        self.parents_by_type = {}
+        # Queried for modules not loaded into the list
+        self.database = None
         if module_info:
-            self.list_of_module_info.extend(module_info)
+            for dict_data in module_info:
+                self._add_module_info(dict_data)
         #self.dict_data = {
         #    'file': '',
         #    'name': '',
@@ -33,15 +42,27 @@ class ModuleInfo:
         dict_data = json.load(fp)
         return dict_data
 
-    def set_module_info(self, module_info: Optional[list[dict[str, str]]] = None, json_files: Optional[list[str]] = None):
-        if json_files:
+    def set_module_info(self, module_info: Optional[list[dict[str, str]]] = None, json_files: Optional[list[str]] = None,
+                        database: Optional[str] = None):
+        if database:
+            if self.database is not None:
+                self.database.close()
+            self.database = DesignDatabase(database)
+            self.logger.debug('Set module_info from "%s"' % database)
+        elif json_files:
             for file in json_files:
                 dict_data = self.load_json(file)
-                self.list_of_module_info.append(dict_data)
+                self._add_module_info(dict_data)
                 self.logger.debug('Set module_info "%s"' % dict_data['file'])
-                self.logger.debug(json.dumps(dict_data, indent=4))
         else:
-            self.list_of_module_info.extend(module_info)
+            for dict_data in module_info:
+                self._add_module_info(dict_data)
+
+    def _add_module_info(self, module_info: dict[str, str]):
+        self.list_of_module_info.append(module_info)
+        self.module_info_by_name.setdefault(module_info['name'], module_info)
+        for instance_type in dict.fromkeys(module_info['instances']['type']):
+            self.parents_by_type.setdefault(instance_type, []).append(module_info)
 
     #def set_module_info(self, file: str, name: str,
     #            imports: Optional[list[str]] = None, includes: Optional[list[str]] = None,
@@ -67,47 +88,49 @@ class ModuleInfo:
         names = []
         for module_info in self.list_of_module_info:
             names.append(module_info['name'])
+        if self.database is not None:
+            names += self.database.get_names()
         return names
 
     def get_all_of_module_info(self) -> list[dict[str, str]]:
+        if self.database is not None:
+            return self.list_of_module_info + list(self.database.iter_module_info())
         return self.list_of_module_info
 
     def get_module_info(self, name: str) -> dict[str, str]:
-        for module_info in self.list_of_module_info:
-            if ('name', name) in module_info.items():
-                return module_info
-        self.logger.warning('Cannot found module name "%s"' % name)
-        return None
+        module_info = self.module_info_by_name.get(name)
+        if module_info is None and self.database is not None:
+            module_info = self.database.get_module_info(name)
+        if module_info is None:
+            self.logger.warning('Cannot found module name "%s"' % name)
+        return module_info
 
     def search_top_module(self) -> list[str]:
         top_modules = []
-        search_names = self.get_names()
 
-        while search_names:
-            self.logger.debug('Search names = %s' % str(search_names))
-            module_name = search_names.pop(0)
-            parents = self.search_parent(module_name)
-            if not parents:
+        for module_info in self.list_of_module_info:
+            module_name = module_info['name']
+            if module_name not in self.parents_by_type \
+                    and not (self.database is not None and self.database.search_parent(module_name)):
                 top_modules.append(module_name)
+        if self.database is not None:
+            for module_name in self.database.search_top_module():
+                if module_name not in self.parents_by_type:
+                    top_modules.append(module_name)
 
+        self.logger.debug('Top modules = %s' % str(top_modules))
         return top_modules
 
     def search_parent(self, child_name: str) -> dict[str, str]:
-        child_names = []
-        parent_modules = []
+        parent_modules = list(self.parents_by_type.get(child_name, []))
+        if self.database is not None:
+            parent_modules += [self.database.get_module_info(name)
+                               for name in self.database.search_parent(child_name)]
 
-        self.logger.debug('Search parents of "%s", candidates = %s' % (
-            child_name, str([module_info['name'] for module_info in self.list_of_module_info])))
-        for module_info in self.list_of_module_info:
-            for i in range(len(module_info['instances']['type'])):
-                instance_name = module_info['instances']['name'][i]
-                instance_type = module_info['instances']['type'][i]
-                if child_name == instance_type:
-                    child_names.append(instance_name)
-                    parent_modules.append(module_info)
-                    self.logger.debug('Hit! Module "%s" is %s parent' % (module_info['name'], child_name))
-                    break
-        if not parent_modules:
+        if parent_modules:
+            self.logger.debug('Hit! Modules %s are %s parents' % (
+                str([module_info['name'] for module_info in parent_modules]), child_name))
+        else:
             self.logger.debug('%s is not parent. Therefere, top module' % child_name)
 
         return parent_modules
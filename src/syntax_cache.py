@@ -0,0 +1,160 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""On-disk cache of ``verible-verilog-syntax --export_json`` results"""
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+_CACHE_OPTIONS = ("gen_tree", "skip_null", "gen_tokens", "gen_rawtokens")
+
+
+class SyntaxCache:
+  """Persistent, size-bounded LRU cache of per-file parser output.
+
+  Entries are keyed by a hash of the source bytes, the parser binary identity
+  and the parse options, so an entry stays valid for as long as the file
+  content is unchanged. Each entry holds the file's ``--export_json`` data as
+  zlib-compressed compact JSON, from which ``VeribleVerilogSyntax`` rebuilds
+  SyntaxData without running the parser.
+
+  Args:
+    directory: cache directory; created if it doesn't exist.
+    max_size: maximum total size of cache entries in bytes. Least recently
+      used entries are removed when it is exceeded.
+
+  Attributes:
+    hits (int): number of lookups answered from the cache.
+    misses (int): number of lookups not found in the cache.
+  """
+
+  _SUFFIX = ".json.z"
+
+  def __init__(self, directory: str, max_size: int = 256 * 1024 * 1024):
+    self.directory = directory
+    self.max_size = max_size
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self._entries = collections.OrderedDict()
+    self._size = 0
+
+    os.makedirs(directory, exist_ok=True)
+    entries = []
+    for entry in os.scandir(directory):
+      if entry.is_file() and entry.name.endswith(self._SUFFIX):
+        st = entry.stat()
+        entries.append((st.st_mtime_ns, entry.name[:-len(self._SUFFIX)],
+                        st.st_size))
+    for _, key, size in sorted(entries):
+      self._entries[key] = size
+      self._size += size
+    self._evict()
+
+  @property
+  def size(self) -> int:
+    """Total size of cache entries in bytes."""
+    return self._size
+
+  @staticmethod
+  def key(source_code: bytes, parser_id: str,
+          options: Dict[str, Any]) -> str:
+    """Returns the cache key of a file.
+
+    Args:
+      source_code: file content.
+      parser_id: string identifying the parser binary.
+      options: parsing options, as passed to ``VeribleVerilogSyntax``.
+    """
+    h = hashlib.sha256(source_code)
+    h.update(b"\0" + parser_id.encode("utf-8"))
+    for name in _CACHE_OPTIONS:
+      h.update(b"\0%s=%d" % (name.encode("ascii"), bool(options.get(name))))
+    return h.hexdigest()
+
+  def get(self, key: str) -> Optional[Dict[str, Any]]:
+    """Returns the cached parser output for a key, or None on a miss."""
+    path = self._path(key)
+    try:
+      with open(path, "rb") as f:
+        file_json = json.loads(zlib.decompress(f.read()))
+      os.utime(path)
+    except (OSError, ValueError, zlib.error):
+      with self._lock:
+        self.misses += 1
+        self._forget(key)
+      return None
+
+    with self._lock:
+      self.hits += 1
+      if key in self._entries:
+        self._entries.move_to_end(key)
+    return file_json
+
+  def put(self, key: str, file_json: Optional[Dict[str, Any]]) -> None:
+    """Stores parser output of a single file."""
+    data = zlib.compress(json.dumps(file_json or {},
+                                    separators=(",", ":")).encode("utf-8"))
+    fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+    try:
+      with os.fdopen(fd, "wb") as f:
+        f.write(data)
+      os.replace(tmp_path, self._path(key))
+    except OSError:
+      if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+      return
+
+    with self._lock:
+      self._forget(key)
+      self._entries[key] = len(data)
+      self._size += len(data)
+      self._evict()
+
+  def clear(self) -> None:
+    """Removes all entries and resets counters."""
+    with self._lock:
+      for key in list(self._entries):
+        try:
+          os.remove(self._path(key))
+        except OSError:
+          pass
+      self._entries.clear()
+      self._size = 0
+      self.hits = 0
+      self.misses = 0
+
+  def _evict(self) -> None:
+    """Removes least recently used entries until the size limit is met."""
+    while self._size > self.max_size and len(self._entries) > 1:
+      key = next(iter(self._entries))
+      self._forget(key)
+      try:
+        os.remove(self._path(key))
+      except OSError:
+        pass
+
+  def _forget(self, key: str) -> None:
+    size = self._entries.pop(key, None)
+    if size is not None:
+      self._size -= size
+
+  def _path(self, key: str) -> str:
+    return os.path.join(self.directory, key + self._SUFFIX)
@@ -0,0 +1,201 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Batching executor for ``verible-verilog-syntax`` requests"""
+
+import concurrent.futures
+import os
+import queue
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import verible_verilog_syntax
+
+
+class _Request:
+  def __init__(self, path: Optional[str], string: Optional[str],
+               options: Optional[Dict[str, Any]]):
+    self.path = path
+    self.string = string
+    self.options = options or {}
+    if string is not None and self.options.get("source_mode", "read") != "read":
+      # Strings are parsed from temporary files removed after the batch, so
+      # their source must be read, as parse_string does
+      self.options = {**self.options, "source_mode": "read"}
+    # Collection-valued options such as keep_tags must be hashable
+    self.options_key = tuple(sorted(
+        (name, frozenset(value) if isinstance(value, (list, set)) else value)
+        for name, value in self.options.items()))
+    self.future = concurrent.futures.Future()
+
+
+_SHUTDOWN = object()
+
+
+class VeribleVerilogSyntaxPool:
+  """Executor batching parse requests into multi-file parser invocations.
+
+  ``verible-verilog-syntax`` handles one command line per process, so the
+  cost of starting it is amortized by batching instead: each of ``workers``
+  threads takes up to ``max_batch_size`` queued requests, waiting at most
+  ``max_wait`` seconds for the batch to fill, and parses them with one
+  process per distinct set of options. Strings are written to temporary
+  files for the duration of the batch; their ``source_mode`` is always
+  "read".
+
+  Args:
+    parser: VeribleVerilogSyntax used to run the parser.
+    workers: number of batches parsed concurrently. Defaults to
+      ``os.cpu_count()``.
+    max_batch_size: maximum number of requests in one batch.
+    max_wait: maximum time in seconds a worker waits for more requests
+      after receiving the first request of a batch.
+  """
+
+  def __init__(self, parser: verible_verilog_syntax.VeribleVerilogSyntax,
+               workers: Optional[int] = None, max_batch_size: int = 64,
+               max_wait: float = 0.005):
+    if max_batch_size < 1:
+      raise ValueError("max_batch_size must be at least 1")
+    self.parser = parser
+    self.max_batch_size = max_batch_size
+    self.max_wait = max_wait
+    self._queue = queue.Queue()
+    self._lock = threading.Lock()
+    self._shutdown = False
+    self._workers = [
+      threading.Thread(target=self._work, daemon=True)
+      for _ in range(workers or os.cpu_count() or 1)
+    ]
+    for worker in self._workers:
+      worker.start()
+
+  def submit_file(self, path: str, options: Dict[str, Any] = None) \
+                  -> concurrent.futures.Future:
+    """Schedules parsing of a single SystemVerilog file.
+
+    Args:
+      path: path to a file to parse.
+      options: dict with parsing options, as in
+        ``VeribleVerilogSyntax.parse_file``.
+
+    Returns:
+      Future of parsing results in SyntaxData object.
+    """
+    return self._submit(_Request(path, None, options))
+
+  def submit_string(self, string: str, options: Dict[str, Any] = None) \
+                    -> concurrent.futures.Future:
+    """Schedules parsing of a string with SystemVerilog code.
+
+    Args:
+      string: SystemVerilog code to parse.
+      options: dict with parsing options, as in
+        ``VeribleVerilogSyntax.parse_string``.
+
+    Returns:
+      Future of parsing results in SyntaxData object.
+    """
+    return self._submit(_Request(None, string, options))
+
+  def parse_file(self, path: str, options: Dict[str, Any] = None) \
+                 -> Optional[verible_verilog_syntax.SyntaxData]:
+    """Parse single SystemVerilog file; blocks until the result is ready."""
+    return self.submit_file(path, options).result()
+
+  def parse_string(self, string: str, options: Dict[str, Any] = None) \
+                   -> Optional[verible_verilog_syntax.SyntaxData]:
+    """Parse a string with SystemVerilog code; blocks until it is done."""
+    return self.submit_string(string, options).result()
+
+  def shutdown(self, wait: bool = True) -> None:
+    """Stops workers once all already submitted requests are processed."""
+    with self._lock:
+      if not self._shutdown:
+        self._shutdown = True
+        for _ in self._workers:
+          self._queue.put(_SHUTDOWN)
+    if wait:
+      for worker in self._workers:
+        worker.join()
+
+  def __enter__(self) -> "VeribleVerilogSyntaxPool":
+    return self
+
+  def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+    self.shutdown(wait=True)
+
+  def _submit(self, request: _Request) -> concurrent.futures.Future:
+    with self._lock:
+      if self._shutdown:
+        raise RuntimeError("cannot schedule new requests after shutdown")
+      self._queue.put(request)
+    return request.future
+
+  def _work(self) -> None:
+    while True:
+      request = self._queue.get()
+      if request is _SHUTDOWN:
+        return
+      batch = [request]
+      deadline = time.monotonic() + self.max_wait
+      stop = False
+      while len(batch) < self.max_batch_size:
+        timeout = deadline - time.monotonic()
+        try:
+          if timeout > 0:
+            request = self._queue.get(timeout=timeout)
+          else:
+            request = self._queue.get_nowait()
+        except queue.Empty:
+          break
+        if request is _SHUTDOWN:
+          stop = True
+          break
+        batch.append(request)
+
+      self._run_batch(batch)
+      if stop:
+        return
+
+  def _run_batch(self, batch: List[_Request]) -> None:
+    groups = {}
+    for request in batch:
+      if request.future.set_running_or_notify_cancel():
+        groups.setdefault(request.options_key, []).append(request)
+
+    for requests in groups.values():
+      try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+          futures = {}
+          for i, request in enumerate(requests):
+            path = request.path
+            if path is None:
+              path = os.path.join(tmp_dir, f"{i}.sv")
+              with open(path, "wb") as f:
+                f.write(request.string.encode("utf-8"))
+            futures.setdefault(path, []).append(request.future)
+
+          data = self.parser._parse(list(futures),
+                                    options=requests[0].options)
+      except Exception as e:
+        for request in requests:
+          request.future.set_exception(e)
+        continue
+
+      for path, path_futures in futures.items():
+        for future in path_futures:
+          future.set_result(data.get(path, None))
@@ -0,0 +1,291 @@
+#
+# Copyright 2022 Takumi Hoshi.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compiled multi-selector queries over verible_verilog_syntax trees.
+
+Selectors are written in a small CSS-like language::
+
+  kModuleDeclaration@module > kModuleHeader SymbolIdentifier|EscapedIdentifier@id
+
+* A step is a tag, ``|``-separated tag alternatives or ``*`` (any tagged
+  node), optionally followed by ``@name`` to capture the matched node.
+* Steps separated by whitespace match descendants; steps separated by ``>``
+  match direct children.
+
+Selectors made of tags only are answered from the tag index of
+verible_verilog_syntax trees (``RootNode`` and ``CompactTree`` trees), one
+index lookup per step. The other selectors, and all selectors on trees
+without a tag index, are evaluated together in a single pre-order traversal
+of the tree.
+"""
+
+import dataclasses
+import heapq
+import re
+from typing import (Any, Callable, Dict, FrozenSet, Iterable, Iterator, List,
+                    Optional, Tuple)
+
+import verible_verilog_syntax
+
+_TOKEN = re.compile(r">|[^\s>]+")
+_STEP = re.compile(r"^(\*|[^\s>@|*]+(?:\|[^\s>@|*]+)*)(?:@(\w+))?$")
+
+
+@dataclasses.dataclass
+class Capture:
+  """Node matched by a selector step.
+
+  Attributes:
+    node: Matched node.
+    position (int): Pre-order position of the node in the searched tree.
+    depth (int): Depth of the node below the searched tree root.
+  """
+  node: Any
+  position: int
+  depth: int
+
+
+@dataclasses.dataclass
+class QueryMatch:
+  """Single match of a selector.
+
+  Attributes:
+    name (str): Selector name.
+    node (Capture): Node matched by the last step.
+    captures (Dict[str, Capture]): Nodes matched by steps with ``@name``.
+  """
+  name: str
+  node: Capture
+  captures: Dict[str, Capture]
+
+
+@dataclasses.dataclass(frozen=True)
+class _Step:
+  child: bool
+  tags: Optional[FrozenSet[str]]
+  capture: Optional[str]
+
+  def matches(self, tag: Optional[str]) -> bool:
+    if tag is None:
+      return False
+    return self.tags is None or tag in self.tags
+
+
+def _tag_index(tree) -> Optional[Tuple["verible_verilog_syntax._TagIndex",
+                                        int, Callable[[int], Any],
+                                        Callable[[Iterable[str]], List[Any]]]]:
+  """Returns the tag index of the tree a node belongs to.
+
+  Returns:
+    Tuple of the index, the node's position in it, a function returning the
+    node at a position and a function converting tags to index keys; None
+    if the tree has no tag index.
+  """
+  vvs = verible_verilog_syntax
+  if isinstance(tree, vvs.CompactBranchNode):
+    compact = tree._tree
+    def keys(tags):
+      return [key for key in map(compact.tag_id, tags) if key >= 0]
+    return compact._get_tag_index(), tree.index, compact.node, keys
+  if isinstance(tree, vvs.BranchNode):
+    root = tree.root
+    if isinstance(root, vvs.RootNode):
+      index, nodes, positions = root._get_tag_index()
+      # Lazy trees map only nodes created by lookups in the index
+      position = positions.get(id(tree))
+      if position is not None:
+        return index, position, nodes.__getitem__, list
+  return None
+
+
+def _compile(selector: str) -> Tuple[_Step, ...]:
+  steps = []
+  child = False
+  for token in _TOKEN.findall(selector):
+    if token == ">":
+      if child or not steps:
+        raise ValueError(f"Misplaced '>' in selector {selector!r}")
+      child = True
+      continue
+    m = _STEP.match(token)
+    if not m:
+      raise ValueError(f"Invalid step {token!r} in selector {selector!r}")
+    tags = None if m.group(1) == "*" else frozenset(m.group(1).split("|"))
+    steps.append(_Step(child, tags, m.group(2)))
+    child = False
+  if child or not steps:
+    raise ValueError(f"Incomplete selector {selector!r}")
+  return tuple(steps)
+
+
+class TreeQuery:
+  """Set of named selectors compiled once and matched together.
+
+  Args:
+    selectors: dict mapping result names to selector strings.
+
+  Raises:
+    ValueError: when a selector can't be parsed.
+  """
+
+  def __init__(self, selectors: Dict[str, str]):
+    self.names = list(selectors)
+    self._steps = [_compile(selector) for selector in selectors.values()]
+    # Selectors which can be answered from a tag index
+    self._indexable = [i for i, steps in enumerate(self._steps)
+                       if all(step.tags is not None for step in steps)]
+
+  def iter_matches(self, tree) -> Iterator[QueryMatch]:
+    """Yields matches of all selectors in pre-order of their last nodes.
+
+    Matches ending at the same node are ordered by selector, then by
+    pre-order of the nodes matched by the previous steps, from the last
+    step backwards.
+
+    Args:
+      tree: Root of the searched (sub)tree. Any node with ``children`` and
+        optional ``tag`` attributes will do.
+    """
+    selectors = range(len(self._steps))
+    streams = []
+    index = _tag_index(tree) if self._indexable else None
+    if index is not None:
+      streams.extend(self._iter_indexed(i, *index) for i in self._indexable)
+      selectors = [i for i in selectors if i not in self._indexable]
+    if selectors:
+      streams.append(self._iter_traversal(tree, selectors))
+    for _, _, match in heapq.merge(*streams, key=lambda m: m[:2]):
+      yield match
+
+  def _iter_indexed(self, selector: int, index, base: int,
+                    node_at: Callable[[int], Any],
+                    keys: Callable[[Iterable[str]], List[Any]]) \
+                    -> Iterator[Tuple[int, int, QueryMatch]]:
+    """Yields (position, selector, match) of a selector using a tag index."""
+    pre_order = verible_verilog_syntax.PreOrderTreeIterator
+    steps = self._steps[selector]
+    name = self.names[selector]
+    depth = index.depth
+    # Partial matches as tuples of positions matched by the steps so far
+    partials = [(position,) for position
+                in index.find(base, keys(steps[0].tags), pre_order)]
+    for step in steps[1:]:
+      tags = keys(step.tags)
+      extended = []
+      for partial in partials:
+        parent = partial[-1]
+        for position in index.find(parent, tags, pre_order):
+          if position != parent and (not step.child
+                                     or depth[position] == depth[parent] + 1):
+            extended.append(partial + (position,))
+      partials = extended
+    partials.sort(key=lambda partial: partial[::-1])
+
+    # Captures are shared by all matches including a node, as in traversals
+    captured = {}
+    def capture(position):
+      result = captured.get(position)
+      if result is None:
+        result = captured[position] = Capture(
+            node_at(position), position - base, depth[position] - depth[base])
+      return result
+
+    named = [(i, step.capture) for i, step in enumerate(steps) if step.capture]
+    for partial in partials:
+      yield (partial[-1] - base, selector,
+             QueryMatch(name, capture(partial[-1]),
+                        {capture_name: capture(partial[i])
+                         for i, capture_name in named}))
+
+  def _iter_traversal(self, tree, selectors: List[int]) \
+                      -> Iterator[Tuple[int, int, QueryMatch]]:
+    """Yields (position, selector, match) of selectors in one traversal."""
+    steps = self._steps
+    names = self.names
+    # First steps by tag, to start partial matches without testing each one
+    first_by_tag = {}
+    first_any = []
+    for i in selectors:
+      if steps[i][0].tags is None:
+        first_any.append((i, 0, ()))
+      else:
+        for tag in steps[i][0].tags:
+          first_by_tag.setdefault(tag, []).append((i, 0, ()))
+    position = 0
+    # Partial match: (selector index, index of next step, captures)
+    # Stack items: (node, depth, partials valid in the whole subtree,
+    #               tags awaited by these partials (None: any tag),
+    #               partials valid only for the node itself)
+    stack = [(tree, 0, (), frozenset(), ())]
+    while stack:
+      node, depth, inherited, awaited, direct = stack.pop()
+      tag = getattr(node, "tag", None)
+      capture = None
+      descendant = []
+      child = []
+
+      if tag is not None:
+        candidates = first_any + first_by_tag.get(tag, [])
+        if inherited and (awaited is None or tag in awaited):
+          candidates.extend(p for p in inherited
+                            if steps[p[0]][p[1]].matches(tag))
+        if direct:
+          candidates.extend(p for p in direct
+                            if steps[p[0]][p[1]].matches(tag))
+
+        matches = []
+        for i, step_index, captures in candidates:
+          step = steps[i][step_index]
+          if capture is None:
+            capture = Capture(node, position, depth)
+          if step.capture:
+            captures = captures + ((step.capture, capture),)
+          if step_index + 1 == len(steps[i]):
+            matches.append((position, i,
+                            QueryMatch(names[i], capture, dict(captures))))
+          elif steps[i][step_index + 1].child:
+            child.append((i, step_index + 1, captures))
+          else:
+            descendant.append((i, step_index + 1, captures))
+        # Matches of a selector are already in order; sorting is stable
+        if len(matches) > 1:
+          matches.sort(key=lambda m: m[1])
+        yield from matches
+
+      position += 1
+      children = getattr(node, "children", ())
+      if children:
+        if descendant:
+          inherited_children = inherited + tuple(descendant)
+          awaited_children = awaited
+          for i, step_index, _ in descendant:
+            tags = steps[i][step_index].tags
+            if tags is None or awaited_children is None:
+              awaited_children = None
+            else:
+              awaited_children = awaited_children | tags
+        else:
+          inherited_children = inherited
+          awaited_children = awaited
+        direct_children = tuple(child)
+        stack.extend((c, depth + 1, inherited_children, awaited_children,
+                      direct_children)
+                     for c in reversed(children))
+
+  def run(self, tree) -> Dict[str, List[QueryMatch]]:
+    """Returns matches of each selector, in pre-order of their last nodes."""
+    result = {name: [] for name in self.names}
+    for match in self.iter_matches(tree):
+      result[match.name].append(match)
+    return result
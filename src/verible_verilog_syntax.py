@@ -13,15 +13,32 @@
 # limitations under the License.
 """Wrapper for ``verible-verilog-syntax --export_json``"""
 
+import array
+import bisect
 import collections
+import concurrent.futures
+import functools
+import heapq
+import itertools
 import json
+import mmap
+import operator
+import os
 import re
+import shutil
 import subprocess
-from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+import threading
+import time
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator,
+                    FrozenSet, List, Optional, Sequence, Set, Tuple,
+                    Union)
 
 import anytree
 import dataclasses
 
+if TYPE_CHECKING:
+  import syntax_cache
+
 _CSI_SEQUENCE = re.compile("\033\\[.*?m")
 
 
@@ -44,6 +61,12 @@ TreeIterator = Union["_TreeIteratorBase", anytree.iterators.AbstractIter]
 # Custom tree iterators with an option for reverse children iteration
 
 class _TreeIteratorBase:
+  """Base of tree iterators.
+
+  Iterators keep pending nodes on an explicit stack or queue instead of
+  recursing, so they work on trees of any depth and yield each node
+  directly rather than through a chain of nested generators.
+  """
   def __init__(self, tree: "Node",
                filter_: Optional[CallableFilter] = None,
                reverse_children: bool = False):
@@ -60,36 +83,112 @@ class _TreeIteratorBase:
     return tree.children if not self.reverse_children \
                          else reversed(tree.children)
 
+  def _stack_children(self, tree: Optional["Node"]) -> Iterable["Node"]:
+    """Children in the order they are pushed on a stack (last is next)"""
+    if not tree or not hasattr(tree, "children"):
+      return []
+    return tree.children if self.reverse_children \
+                         else reversed(tree.children)
+
   def _iter_tree(self, tree: Optional["Node"]) -> Iterable["Node"]:
     raise NotImplementedError("Subclass must implement '_iter_tree' method")
 
 
 class PreOrderTreeIterator(_TreeIteratorBase):
   def _iter_tree(self, tree: Optional["Node"]) -> Iterable["Node"]:
-    if self.filter_(tree):
-      yield tree
-    for child in self._iter_children(tree):
-      yield from self._iter_tree(child)
+    filter_ = self.filter_
+    stack = [tree]
+    while stack:
+      node = stack.pop()
+      if filter_(node):
+        yield node
+      stack.extend(self._stack_children(node))
 
 
 class PostOrderTreeIterator(_TreeIteratorBase):
   def _iter_tree(self, tree: Optional["Node"]) -> Iterable["Node"]:
-    for child in self._iter_children(tree):
-      yield from self._iter_tree(child)
-    if self.filter_(tree):
-      yield tree
+    filter_ = self.filter_
+    # Stack of nodes with iterators over their not yet visited children
+    stack = [(tree, iter(self._iter_children(tree)))]
+    while stack:
+      node, children = stack[-1]
+      for child in children:
+        stack.append((child, iter(self._iter_children(child))))
+        break
+      else:
+        stack.pop()
+        if filter_(node):
+          yield node
 
 
 class LevelOrderTreeIterator(_TreeIteratorBase):
   def _iter_tree(self, tree: Optional["Node"]) -> Iterable["Node"]:
+    filter_ = self.filter_
     queue = collections.deque([tree])
-    while len(queue) > 0:
+    while queue:
       n = queue.popleft()
-      if self.filter_(n):
+      if filter_(n):
         yield n
       queue.extend(self._iter_children(n))
 
 
+class _TagIndex:
+  """Tag to pre-order positions index of a tree.
+
+  Nodes are identified by their pre-order position. A subtree occupies the
+  positions from its root up to ``last[root]``, so a search in a subtree
+  is a range lookup in each tag's sorted position list.
+
+  Args:
+    tags: tag of each node in pre-order; None for nodes without a tag.
+    parents: parent position of each node in pre-order; -1 for the root.
+  """
+  def __init__(self, tags: List[Any], parents: List[int]):
+    n = len(tags)
+    # Computed in lists, which are faster to index than arrays
+    depth = [0] * n
+    last = list(range(n))
+    for i in range(1, n):
+      depth[i] = depth[parents[i]] + 1
+    for i in range(n - 1, 0, -1):
+      parent = parents[i]
+      if last[i] > last[parent]:
+        last[parent] = last[i]
+    self.depth = array.array("i", depth)
+    self.last = array.array("i", last)
+    self.positions = {}
+    for i, tag in enumerate(tags):
+      if tag is not None:
+        self.positions.setdefault(tag, []).append(i)
+
+  def find(self, position: int, tags: List[Any],
+           iter_: TreeIterator) -> List[int]:
+    """Returns positions of nodes with any of tags in a subtree.
+
+    Positions are sorted in the order in which ``iter_`` would visit them.
+    """
+    first = position
+    last = self.last[position]
+    hits = []
+    for tag in dict.fromkeys(tags):
+      positions = self.positions.get(tag)
+      if positions:
+        hits.extend(positions[bisect.bisect_left(positions, first):
+                              bisect.bisect_right(positions, last)])
+    if len(tags) > 1:
+      hits.sort()
+    if iter_ is LevelOrderTreeIterator:
+      # Breadth-first order is pre-order stably sorted by depth
+      hits.sort(key=self.depth.__getitem__)
+    elif iter_ is PostOrderTreeIterator:
+      hits.sort(key=lambda i: self.last[i] - self.depth[i])
+    return hits
+
+
+_INDEXED_ITERATORS = (PreOrderTreeIterator, PostOrderTreeIterator,
+                      LevelOrderTreeIterator)
+
+
 class Node(anytree.NodeMixin):
   """Base VeribleVerilogSyntax syntax tree node.
 
@@ -132,10 +231,39 @@ class Node(anytree.NodeMixin):
     """Print node representation formatted for printing in terminal."""
     return super().__repr__()
 
+  # anytree hooks; changing children of a branch changes its span and
+  # invalidates the tag index of the tree
+  def _pre_attach(self, parent: "BranchNode") -> None:
+    # Children of a lazy branch must exist before another one is added
+    if getattr(parent, "_json", None) is not None:
+      parent._materialize()
+
+  def _post_attach(self, parent: "BranchNode") -> None:
+    parent._invalidate_span()
+    parent._invalidate_tag_index()
+
+  def _post_detach(self, parent: "BranchNode") -> None:
+    parent._invalidate_span()
+    parent._invalidate_tag_index()
+
+  def _invalidate_tag_index(self) -> None:
+    root = self.root
+    if isinstance(root, RootNode):
+      root._tag_index = None
+
+
+# Span of a branch not computed yet, although valid
+_SPAN_PENDING = object()
+
 
 class BranchNode(Node):
   """Syntax tree branch node
 
+  The span (``start`` and ``end``) is computed from children once and
+  cached. It is invalidated, along with spans of all ancestors, whenever a
+  child is attached or detached. A valid span implies valid spans in the
+  whole subtree; spans of a subtree are computed without recursion.
+
   Attributes:
     tag (str): Node tag.
     children (Optional[Node]): Child nodes.
@@ -144,19 +272,62 @@ class BranchNode(Node):
                children: Optional[List[Node]] = None):
     super().__init__(parent)
     self.tag = tag
+    self._start = None
+    self._end = None
+    self._span_valid = False
     self.children = children if children is not None else []
 
   @property
   def start(self) -> Optional[int]:
-    first_token = self.find(lambda n: isinstance(n, TokenNode),
-                            iter_=PostOrderTreeIterator)
-    return first_token.start if first_token else None
+    if not self._span_valid or self._start is _SPAN_PENDING:
+      self._update_span()
+    return self._start
 
   @property
   def end(self) -> Optional[int]:
-    last_token = self.find(lambda n: isinstance(n, TokenNode),
-                           iter_=PostOrderTreeIterator, reverse_children=True)
-    return last_token.end if last_token else None
+    if not self._span_valid or self._start is _SPAN_PENDING:
+      self._update_span()
+    return self._end
+
+  def _update_span(self) -> None:
+    """Computes spans of the branch and of descendants lacking them."""
+    # Post-order walk of branches whose span has to be computed; stack
+    # items are (branch, whether its children are done)
+    stack = [(self, False)]
+    while stack:
+      node, done = stack.pop()
+      if not done:
+        tree = getattr(node, "_json", None)
+        if tree is not None:
+          # Children of a lazy branch don't exist yet
+          node._start, node._end = _json_span(tree)
+          node._span_valid = True
+          continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in node.children
+                     if isinstance(child, BranchNode)
+                     and (not child._span_valid
+                          or child._start is _SPAN_PENDING))
+        continue
+      start = None
+      end = None
+      for child in node.children:
+        child_start = child.start
+        if child_start is not None:
+          if start is None:
+            start = child_start
+          end = child.end
+      node._start = start
+      node._end = end
+      node._span_valid = True
+
+  def _invalidate_span(self) -> None:
+    # A valid span implies valid spans in the whole subtree, so ancestors of
+    # an invalid node are already invalid.
+    node = self
+    while node is not None and node._span_valid:
+      node._span_valid = False
+      node = node.parent
 
   def iter_find_all(self, filter_: Union[CallableFilter, KeyValueFilter, None],
                     max_count: int = 0,
@@ -179,23 +350,42 @@ class BranchNode(Node):
     def as_list(v):
       return v if isinstance(v, list) else [v]
 
-    if filter_ and not callable(filter_):
-      filters = filter_
-      def f(node):
-        for attr,value in filters.items():
-          if not hasattr(node, attr):
-            return False
-          if getattr(node, attr) not in as_list(value):
-            return False
-        return True
-      filter_ = f
-
-    for node in iter_(self, filter_, **kwargs):
+    nodes = None
+    if (isinstance(filter_, dict) and list(filter_) == ["tag"]
+        and not kwargs and iter_ in _INDEXED_ITERATORS):
+      nodes = self._find_by_tags(as_list(filter_["tag"]), iter_)
+
+    if nodes is None:
+      if filter_ and not callable(filter_):
+        filters = filter_
+        def f(node):
+          for attr,value in filters.items():
+            if not hasattr(node, attr):
+              return False
+            if getattr(node, attr) not in as_list(value):
+              return False
+          return True
+        filter_ = f
+      nodes = iter_(self, filter_, **kwargs)
+
+    for node in nodes:
       yield node
       max_count -= 1
       if max_count == 0:
         break
 
+  def _find_by_tags(self, tags: List[str],
+                    iter_: TreeIterator) -> Optional[List[Node]]:
+    """Looks up nodes with specified tags in the root's tag index.
+
+    Returns None when the node is not part of a RootNode tree.
+    """
+    root = self.root
+    if not isinstance(root, RootNode):
+      return None
+    index, nodes, positions = root._get_tag_index()
+    return [nodes[i] for i in index.find(positions[id(self)], tags, iter_)]
+
   def find(self, filter_: Union[CallableFilter, KeyValueFilter, None],
            iter_: TreeIterator = LevelOrderTreeIterator, **kwargs) \
            -> Optional[Node]:
@@ -241,9 +431,15 @@ class BranchNode(Node):
 
 
 class RootNode(BranchNode):
-  """Syntax tree root node."""
+  """Syntax tree root node.
+
+  Searches by tag only (``{"tag": ...}`` filters) anywhere in the tree are
+  answered from a tag index, built on first use and dropped whenever the
+  tree changes.
+  """
   def __init__(self, tag: str, syntax_data: Optional["SyntaxData"] = None,
                children: Optional[List[Node]] = None):
+    self._tag_index = None
     super().__init__(tag, None, children)
     self._syntax_data = syntax_data
 
@@ -251,6 +447,27 @@ class RootNode(BranchNode):
   def syntax_data(self) -> Optional["SyntaxData"]:
     return self._syntax_data
 
+  def _get_tag_index(self) -> Tuple[_TagIndex, List[Node], Dict[int, int]]:
+    """Returns tag index, nodes in pre-order and node id to position map."""
+    if self._tag_index is None:
+      # anytree keeps children in a private list; reading it directly saves
+      # copying it into a tuple for each node
+      nodes = []
+      parents = []
+      stack = [(self, -1)]
+      while stack:
+        node, parent = stack.pop()
+        position = len(nodes)
+        nodes.append(node)
+        parents.append(parent)
+        children = getattr(node, "_NodeMixin__children", None)
+        if children:
+          stack.extend(zip(reversed(children), itertools.repeat(position)))
+      tags = [getattr(node, "tag", None) for node in nodes]
+      positions = dict(zip(map(id, nodes), itertools.count()))
+      self._tag_index = (_TagIndex(tags, parents), nodes, positions)
+    return self._tag_index
+
 
 class LeafNode(Node):
   """Syntax tree leaf node.
@@ -307,6 +524,397 @@ class TokenNode(LeafNode):
     return " ".join(parts)
 
 
+def _json_span(tree: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
+  """Returns span of a JSON subtree: its first and last tokens' offsets"""
+  start = None
+  stack = [tree]
+  while stack:
+    node = stack.pop()
+    if node is None:
+      continue
+    if "children" in node:
+      stack.extend(reversed(node["children"]))
+    else:
+      start = node["start"]
+      break
+  if start is None:
+    return None, None
+  stack = [tree]
+  while stack:
+    node = stack.pop()
+    if node is None:
+      continue
+    if "children" in node:
+      stack.extend(node["children"])
+    else:
+      return start, node["end"]
+
+
+def _find_json_tags(tree: Dict[str, Any], tags: Set[str],
+                    found: Set[int]) -> None:
+  """Adds ids of JSON branches having descendants with any of tags to found"""
+  # Frames of [branch, iterator over its children, has matching descendant]
+  stack = [[tree, iter(tree["children"]), False]]
+  while stack:
+    frame = stack[-1]
+    for child in frame[1]:
+      if child is None:
+        continue
+      if child["tag"] in tags:
+        frame[2] = True
+      if "children" in child:
+        stack.append([child, iter(child["children"]), False])
+        break
+    else:
+      stack.pop()
+      if frame[2]:
+        found.add(id(frame[0]))
+        if stack:
+          stack[-1][2] = True
+
+
+def subtree_height(node: anytree.NodeMixin) -> int:
+  """Returns height of a tree, going through the ``children`` property.
+
+  anytree computes ``height`` recursively from its private child list,
+  which is empty in trees creating children on first access, such as lazy
+  syntax trees. This walks the property instead, without recursion.
+  """
+  height = 0
+  stack = [(node, 0)]
+  while stack:
+    node, depth = stack.pop()
+    children = node.children
+    if children:
+      stack.extend((child, depth + 1) for child in children)
+    elif depth > height:
+      height = depth
+  return height
+
+
+class _LazyBranch:
+  """Mixin creating children of a branch from JSON tree data on first access.
+
+  Until then the branch keeps its ``--export_json`` subtree, and its span
+  is read from the first and last tokens of the subtree. Children are
+  created as lazy branches too, so a subtree costs no Python objects until
+  something looks into it. Searches by tag only (``{"tag": ...}`` filters)
+  scan the JSON data of unvisited subtrees and create nodes only along the
+  paths to the matches.
+  """
+  _json = None
+  _skip_null = False
+
+  @property
+  def children(self) -> Tuple[Node, ...]:
+    if self._json is not None:
+      self._materialize()
+    return anytree.NodeMixin.children.fget(self)
+
+  @children.setter
+  def children(self, children: List[Node]) -> None:
+    self._json = None
+    anytree.NodeMixin.children.fset(self, children)
+
+  @children.deleter
+  def children(self) -> None:
+    self._json = None
+    anytree.NodeMixin.children.fdel(self)
+
+  # anytree computes these from its private child list, which is empty
+  # until the branch is materialized
+  @property
+  def is_leaf(self) -> bool:
+    return not self.children
+
+  @property
+  def height(self) -> int:
+    return subtree_height(self)
+
+  def _materialize(self) -> None:
+    tree = self._json
+    skip_null = self._skip_null
+    # A valid span must imply valid spans of the new children; theirs are
+    # computed from their JSON subtrees when first needed
+    span_valid = self._span_valid
+    children = []
+    for child in tree["children"]:
+      if child is None:
+        if not skip_null:
+          children.append(LeafNode())
+      elif "children" in child:
+        node = LazyBranchNode(child["tag"], child, skip_null)
+        if span_valid:
+          node._start = _SPAN_PENDING
+          node._span_valid = True
+        children.append(node)
+      else:
+        children.append(TokenNode(child["tag"], child["start"], child["end"]))
+    # Materializing changes neither the span nor the tags of the tree, so
+    # children are attached directly, without anytree's hooks and its walk
+    # over the ancestors checking for loops
+    for child in children:
+      child._NodeMixin__parent = self
+    self._NodeMixin__children = children
+    self._json = None
+
+  def _find_by_tags(self, tags: List[str],
+                    iter_: TreeIterator) -> Optional[List[Node]]:
+    tags = set(tags)
+    found = set()
+    hits = []
+    # (node, depth, whether node's JSON subtree has been scanned)
+    stack = [(self, 0, False)]
+    while stack:
+      node, depth, scanned = stack.pop()
+      if getattr(node, "tag", None) in tags:
+        hits.append((node, depth))
+      if not isinstance(node, BranchNode):
+        continue
+      tree = node._json if isinstance(node, _LazyBranch) else None
+      if tree is not None:
+        if not scanned:
+          _find_json_tags(tree, tags, found)
+          scanned = True
+        if id(tree) not in found:
+          continue
+      stack.extend((child, depth + 1, scanned)
+                   for child in reversed(node.children))
+
+    if iter_ is LevelOrderTreeIterator:
+      hits.sort(key=lambda hit: hit[1])
+    elif iter_ is PostOrderTreeIterator:
+      # Emit each node after all nodes of its subtree that follow it
+      ordered = []
+      ancestors = []
+      for node, depth in hits:
+        while ancestors:
+          ancestor, ancestor_depth = ancestors[-1]
+          parent = node
+          for _ in range(depth - ancestor_depth):
+            parent = parent.parent
+          if depth > ancestor_depth and parent is ancestor:
+            break
+          ordered.append(ancestors.pop())
+        ancestors.append((node, depth))
+      hits = ordered + ancestors[::-1]
+    return [node for node, _ in hits]
+
+
+class LazyBranchNode(_LazyBranch, BranchNode):
+  """Branch node of a tree parsed with the ``lazy_tree`` option."""
+  def __init__(self, tag: str, tree: Dict[str, Any], skip_null: bool,
+               parent: Optional[Node] = None):
+    # Lazy branches are created in bulk by materialization, so the state
+    # BranchNode.__init__ would set through anytree's setters is set directly
+    self.tag = tag
+    self._start = None
+    self._end = None
+    self._span_valid = False
+    self._NodeMixin__children = []
+    self._json = tree
+    self._skip_null = skip_null
+    if parent is not None:
+      self.parent = parent
+
+
+class LazyRootNode(_LazyBranch, RootNode):
+  """Root node of a tree parsed with the ``lazy_tree`` option.
+
+  The tag index is built from the JSON data of subtrees not materialized
+  yet; nodes are created, along with their ancestors, when looked up in it.
+  """
+  def __init__(self, tag: str, tree: Dict[str, Any], skip_null: bool,
+               syntax_data: Optional["SyntaxData"] = None):
+    super().__init__(tag, syntax_data)
+    self._json = tree
+    self._skip_null = skip_null
+
+  def _get_tag_index(self) -> Tuple[_TagIndex, "_LazyNodes", Dict[int, int]]:
+    """Returns tag index, nodes in pre-order and node id to position map.
+
+    Only nodes which already exist are in the position map; nodes looked
+    up by position are added to it.
+    """
+    if self._tag_index is None:
+      skip_null = self._skip_null
+      # Nodes, or JSON data of nodes not created yet
+      items = []
+      parents = []
+      tags = []
+      positions = {}
+      stack = [(self, -1)]
+      while stack:
+        node, parent = stack.pop()
+        position = len(items)
+        positions[id(node)] = position
+        items.append(node)
+        parents.append(parent)
+        tags.append(getattr(node, "tag", None))
+        tree = getattr(node, "_json", None)
+        if tree is None:
+          children = getattr(node, "_NodeMixin__children", None)
+          if children:
+            stack.extend(zip(reversed(children), itertools.repeat(position)))
+          continue
+        # Unvisited subtree; its nodes are listed as their JSON data
+        json_stack = [(child, position) for child in reversed(tree["children"])
+                      if child is not None or not skip_null]
+        while json_stack:
+          item, parent = json_stack.pop()
+          position = len(items)
+          items.append(item)
+          parents.append(parent)
+          if item is None:
+            tags.append(None)
+            continue
+          tags.append(item["tag"])
+          children = item.get("children")
+          if children:
+            json_stack.extend((child, position) for child in reversed(children)
+                              if child is not None or not skip_null)
+      index = _TagIndex(tags, parents)
+      self._tag_index = (index, _LazyNodes(items, parents, index.last,
+                                           positions), positions)
+    return self._tag_index
+
+
+class _LazyNodes:
+  """Nodes of a lazy tree in pre-order, created on lookup.
+
+  Args:
+    items: node, or JSON data of a node not created yet, at each position.
+    parents: parent position of each node; -1 for the root.
+    last: last position in the subtree of each node.
+    positions: node id to position map, updated with created nodes.
+  """
+  def __init__(self, items: List[Any], parents: List[int],
+               last: Sequence[int], positions: Dict[int, int]):
+    self._items = items
+    self._parents = parents
+    self._last = last
+    self._positions = positions
+
+  def __len__(self) -> int:
+    return len(self._items)
+
+  def __getitem__(self, position: int) -> Node:
+    items = self._items
+    node = items[position]
+    if isinstance(node, Node):
+      return node
+    # Create the missing part of the path from the closest existing ancestor
+    path = []
+    while not isinstance(items[position], Node):
+      path.append(position)
+      position = self._parents[position]
+    node = items[position]
+    for child_position in reversed(path):
+      # Index among siblings, skipping over subtrees of preceding ones
+      index = 0
+      sibling = position + 1
+      while sibling != child_position:
+        sibling = self._last[sibling] + 1
+        index += 1
+      node = node.children[index]
+      items[child_position] = node
+      self._positions[id(node)] = child_position
+      position = child_position
+    return node
+
+
+class SourceChangedError(RuntimeError):
+  """Raised when a MappedSource file has changed since it was parsed."""
+
+
+class MappedSource:
+  """Read-only source code of a file, memory-mapped on demand.
+
+  Behaves like the ``bytes`` object read from the file as far as ``len``,
+  truth testing and indexing/slicing go; a slice copies only its fragment
+  out of the mapping. The file is mapped on first access (or on creation,
+  unless ``lazy`` is set) and the mapping is kept in a cache shared by all
+  instances; at most ``max_mapped`` files are mapped at once, and the least
+  recently used mappings are closed, to be mapped again when needed.
+
+  Offsets of tokens and nodes are only valid in the parsed content. The
+  size and modification time of the file are recorded on creation, and
+  mapping the file again after either has changed raises
+  SourceChangedError. Changes made in place while the file is mapped are
+  not detected; saving by replacing the file leaves the mapping intact.
+
+  Args:
+    path: path to the source file.
+    lazy: whether to defer mapping until first access.
+  """
+
+  max_mapped = 64
+  # MappedSource -> mmap (b"" for empty files), least recently used first
+  _mappings = collections.OrderedDict()
+  _mappings_lock = threading.Lock()
+
+  def __init__(self, path: str, lazy: bool = False):
+    self.path = path
+    self.opened = False
+    # (size, mtime_ns) of the parsed file
+    self._signature = None
+    if not lazy:
+      with MappedSource._mappings_lock:
+        self._mapping()
+    else:
+      try:
+        st = os.stat(path)
+        self._signature = (st.st_size, st.st_mtime_ns)
+      except OSError:
+        pass
+
+  def _mapping(self) -> Union[mmap.mmap, bytes]:
+    # Called with _mappings_lock held, so a mapping isn't closed while read
+    mappings = MappedSource._mappings
+    mapping = mappings.get(self)
+    if mapping is not None:
+      mappings.move_to_end(self)
+      return mapping
+    with open(self.path, "rb") as f:
+      st = os.fstat(f.fileno())
+      signature = (st.st_size, st.st_mtime_ns)
+      if self._signature is None:
+        self._signature = signature
+      elif signature != self._signature:
+        raise SourceChangedError(f"{self.path} changed since it was parsed")
+      # Empty files can't be mapped
+      mapping = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                 if st.st_size else b"")
+    mappings[self] = mapping
+    self.opened = True
+    while len(mappings) > MappedSource.max_mapped:
+      _, evicted = mappings.popitem(last=False)
+      if evicted:
+        evicted.close()
+    return mapping
+
+  def __len__(self) -> int:
+    with MappedSource._mappings_lock:
+      return len(self._mapping())
+
+  def __bool__(self) -> bool:
+    return len(self) > 0
+
+  def __getitem__(self, key: Union[int, slice]) -> Union[int, bytes]:
+    with MappedSource._mappings_lock:
+      return self._mapping()[key]
+
+  def __bytes__(self) -> bytes:
+    return self[:]
+
+  def close(self) -> None:
+    """Unmaps the file; it is mapped again on next access."""
+    with MappedSource._mappings_lock:
+      mapping = MappedSource._mappings.pop(self, None)
+      if mapping:
+        mapping.close()
+
+
 class Token:
   """Token data
 
@@ -347,6 +955,347 @@ class Token:
     return " ".join(parts)
 
 
+class TokenTable:
+  """Columnar token storage.
+
+  Tokens are stored in parallel arrays of tag ids and offsets instead of as
+  separate Token objects. Queries work on whole columns: tag filtering
+  and offset range lookups run in C loops (``map``/``itertools.compress``
+  and ``bisect``), and ``texts`` decodes the source once for all tokens.
+  Indexing and iteration create Token objects on demand, so the table can
+  be used in place of a list of tokens.
+
+  Attributes:
+    syntax_data (Optional[SyntaxData]): Parent SyntaxData.
+    tags (List[str]): Tag names indexed by tag id.
+    tag (array): Tag id of each token.
+    start (array): Byte offset of each token's first character.
+    end (array): Byte offset just past each token.
+  """
+
+  def __init__(self, syntax_data: Optional["SyntaxData"] = None):
+    self.syntax_data = syntax_data
+    self.tags = []
+    self._tag_ids = {}
+    self.tag = array.array("i")
+    self.start = array.array("q")
+    self.end = array.array("q")
+
+  @staticmethod
+  def from_json(tokens, syntax_data: Optional["SyntaxData"]) -> "TokenTable":
+    """Builds table from ``--export_json`` tokens data."""
+    table = TokenTable(syntax_data)
+    tag_ids = table._tag_ids
+    for tag in dict.fromkeys(t["tag"] for t in tokens):
+      tag_ids[tag] = len(table.tags)
+      table.tags.append(tag)
+    table.tag = array.array("i", [tag_ids[t["tag"]] for t in tokens])
+    table.start = array.array("q", [t["start"] for t in tokens])
+    table.end = array.array("q", [t["end"] for t in tokens])
+    return table
+
+  def __len__(self) -> int:
+    return len(self.tag)
+
+  def __getitem__(self, index: Union[int, slice]) \
+                  -> Union[Token, List[Token]]:
+    if isinstance(index, slice):
+      return [self.token(i) for i in range(len(self))[index]]
+    return self.token(range(len(self))[index])
+
+  def __iter__(self) -> Iterator[Token]:
+    return map(self.token, range(len(self)))
+
+  def token(self, index: int) -> Token:
+    """Returns Token object of a token with specified index."""
+    return Token(self.tags[self.tag[index]], self.start[index],
+                 self.end[index], self.syntax_data)
+
+  def tag_id(self, tag: str) -> int:
+    """Returns id of an interned tag, or -1 if no token has that tag."""
+    return self._tag_ids.get(tag, -1)
+
+  def select_tags(self, tags: Iterable[str]) -> List[int]:
+    """Returns indices of tokens with any of specified tags."""
+    tag_ids = {self._tag_ids[tag] for tag in tags if tag in self._tag_ids}
+    if not tag_ids:
+      return []
+    return list(itertools.compress(range(len(self)),
+                                   map(tag_ids.__contains__, self.tag)))
+
+  def offset_range(self, start: int, end: int) -> range:
+    """Returns indices of tokens lying within byte offsets [start, end)."""
+    first = bisect.bisect_left(self.start, start)
+    last = bisect.bisect_left(self.start, end, first)
+    while last > first and self.end[last - 1] > end:
+      last -= 1
+    return range(first, last)
+
+  def texts(self, indices: Optional[Iterable[int]] = None) -> List[str]:
+    """Returns source text of tokens; of all tokens if indices is None."""
+    indices = range(len(self)) if indices is None else indices
+    sd = self.syntax_data
+    source = sd.source_code[:] if sd and sd.source_code else b""
+    starts, ends = self.start, self.end
+    if source.isascii():
+      # Byte offsets are character offsets; decode everything at once
+      text = source.decode("ascii")
+      return [text[starts[i]:ends[i]] if ends[i] <= len(text) else ""
+              for i in indices]
+    return [source[starts[i]:ends[i]].decode("utf-8")
+            if ends[i] <= len(source) else "" for i in indices]
+
+
+class CompactTree:
+  """Array-backed syntax tree storage.
+
+  Nodes are stored in pre-order in parallel arrays instead of as separate
+  Python objects, so a node takes a few dozen bytes. Tags are interned in
+  ``tags`` and referenced by id. Nodes are accessed through lightweight
+  views (``CompactBranchNode``, ``CompactTokenNode``, ``CompactLeafNode``)
+  created on demand, which provide the same API as the ``Node`` classes.
+
+  Attributes:
+    syntax_data (Optional[SyntaxData]): Parent SyntaxData.
+    tags (List[str]): Tag names indexed by tag id.
+    kind (array): Node kind: ``NULL``, ``BRANCH`` or ``TOKEN``.
+    tag (array): Tag id; -1 for null nodes.
+    parent (array): Parent node index; -1 for the root.
+    first_child (array): First child index; -1 if there are no children.
+    next_sibling (array): Next sibling index; -1 for the last child.
+    start (array): Byte offset of the first character; -1 if unknown.
+    end (array): Byte offset just past the last character; -1 if unknown.
+  """
+
+  NULL = 0
+  BRANCH = 1
+  TOKEN = 2
+
+  def __init__(self, syntax_data: Optional["SyntaxData"] = None):
+    self.syntax_data = syntax_data
+    self.tags = []
+    self._tag_ids = {}
+    self.kind = array.array("b")
+    self.tag = array.array("i")
+    self.parent = array.array("i")
+    self.first_child = array.array("i")
+    self.next_sibling = array.array("i")
+    self.start = array.array("q")
+    self.end = array.array("q")
+    self._tag_index = None
+
+  def __len__(self) -> int:
+    return len(self.kind)
+
+  @property
+  def root(self) -> Optional["CompactBranchNode"]:
+    """Root node view."""
+    return self.node(0) if len(self) else None
+
+  def node(self, index: int) -> "CompactNode":
+    """Returns view of a node with specified index."""
+    kind = self.kind[index]
+    if kind == CompactTree.BRANCH:
+      return CompactBranchNode(self, index)
+    if kind == CompactTree.TOKEN:
+      return CompactTokenNode(self, index)
+    return CompactLeafNode(self, index)
+
+  def find_by_tags(self, index: int, tags: List[str],
+                   iter_: TreeIterator) -> List[int]:
+    """Returns indices of nodes with specified tags in a subtree.
+
+    Indices are sorted in the order in which ``iter_`` would visit them.
+    """
+    tag_ids = [self.tag_id(tag) for tag in tags if self.tag_id(tag) >= 0]
+    if not tag_ids:
+      return []
+    return self._get_tag_index().find(index, tag_ids, iter_)
+
+  def _get_tag_index(self) -> _TagIndex:
+    """Returns tag index of the tree; positions are node indices."""
+    if self._tag_index is None:
+      self._tag_index = _TagIndex(self.tag, self.parent)
+    return self._tag_index
+
+  def tag_id(self, tag: str) -> int:
+    """Returns id of an interned tag, or -1 if no node has that tag."""
+    return self._tag_ids.get(tag, -1)
+
+  def _intern(self, tag: str) -> int:
+    tag_id = self._tag_ids.get(tag)
+    if tag_id is None:
+      tag_id = len(self.tags)
+      self.tags.append(tag)
+      self._tag_ids[tag] = tag_id
+    return tag_id
+
+  @staticmethod
+  def from_json(tree, syntax_data: Optional["SyntaxData"],
+                skip_null: bool) -> Optional["CompactTree"]:
+    """Builds tree from ``--export_json`` tree data."""
+    if "children" not in tree:
+      return None
+
+    ct = CompactTree(syntax_data)
+    last_child = []
+    # (json node, parent index)
+    stack = [(tree, -1)]
+    while stack:
+      node, parent = stack.pop()
+      index = len(ct.kind)
+      if node is None:
+        ct.kind.append(CompactTree.NULL)
+        ct.tag.append(-1)
+        ct.start.append(-1)
+        ct.end.append(-1)
+      elif "children" in node:
+        ct.kind.append(CompactTree.BRANCH)
+        ct.tag.append(ct._intern(node["tag"]))
+        ct.start.append(-1)
+        ct.end.append(-1)
+      else:
+        ct.kind.append(CompactTree.TOKEN)
+        ct.tag.append(ct._intern(node["tag"]))
+        ct.start.append(node["start"])
+        ct.end.append(node["end"])
+      ct.parent.append(parent)
+      ct.first_child.append(-1)
+      ct.next_sibling.append(-1)
+      last_child.append(-1)
+
+      if parent >= 0:
+        if last_child[parent] < 0:
+          ct.first_child[parent] = index
+        else:
+          ct.next_sibling[last_child[parent]] = index
+        last_child[parent] = index
+
+      if node is not None and "children" in node:
+        stack.extend((child, index) for child in reversed(node["children"])
+                     if not (skip_null and child is None))
+
+    # Children always follow their parent, so a reverse scan sees them first
+    for index in range(len(ct.kind) - 1, -1, -1):
+      if ct.kind[index] != CompactTree.BRANCH:
+        continue
+      child = ct.first_child[index]
+      while child >= 0:
+        if ct.start[child] >= 0:
+          if ct.start[index] < 0:
+            ct.start[index] = ct.start[child]
+          ct.end[index] = ct.end[child]
+        child = ct.next_sibling[child]
+
+    return ct
+
+
+class CompactNode:
+  """View of a node stored in CompactTree.
+
+  Views are created on demand; two views of the same node compare equal.
+  """
+  __slots__ = ("_tree", "_index")
+
+  def __init__(self, tree: CompactTree, index: int):
+    self._tree = tree
+    self._index = index
+
+  @property
+  def index(self) -> int:
+    """Node index in CompactTree arrays."""
+    return self._index
+
+  @property
+  def syntax_data(self) -> Optional["SyntaxData"]:
+    """Parent SyntaxData"""
+    return self._tree.syntax_data
+
+  @property
+  def parent(self) -> Optional["CompactNode"]:
+    """Parent node."""
+    parent = self._tree.parent[self._index]
+    return self._tree.node(parent) if parent >= 0 else None
+
+  @property
+  def children(self) -> Tuple["CompactNode", ...]:
+    """Child nodes."""
+    tree = self._tree
+    children = []
+    child = tree.first_child[self._index]
+    while child >= 0:
+      children.append(tree.node(child))
+      child = tree.next_sibling[child]
+    return tuple(children)
+
+  @property
+  def start(self) -> Optional[int]:
+    """Byte offset of node's first character in source text"""
+    start = self._tree.start[self._index]
+    return start if start >= 0 else None
+
+  @property
+  def end(self) -> Optional[int]:
+    """Byte offset of a character just past the node in source text."""
+    end = self._tree.end[self._index]
+    return end if end >= 0 else None
+
+  text = Node.text
+  __repr__ = Node.__repr__
+
+  def __eq__(self, other) -> bool:
+    return (isinstance(other, CompactNode) and self._tree is other._tree
+            and self._index == other._index)
+
+  def __hash__(self) -> int:
+    return hash((id(self._tree), self._index))
+
+
+class CompactBranchNode(CompactNode):
+  """View of a syntax tree branch node stored in CompactTree.
+
+  Attributes:
+    tag (str): Node tag.
+  """
+  __slots__ = ()
+
+  @property
+  def tag(self) -> str:
+    return self._tree.tags[self._tree.tag[self._index]]
+
+  def _find_by_tags(self, tags: List[str],
+                    iter_: TreeIterator) -> List["CompactNode"]:
+    tree = self._tree
+    return [tree.node(i) for i in tree.find_by_tags(self._index, tags, iter_)]
+
+  iter_find_all = BranchNode.iter_find_all
+  find = BranchNode.find
+  find_all = BranchNode.find_all
+  to_formatted_string = BranchNode.to_formatted_string
+
+
+class CompactTokenNode(CompactNode):
+  """View of a token node stored in CompactTree.
+
+  Attributes:
+    tag (str): Token tag.
+  """
+  __slots__ = ()
+
+  @property
+  def tag(self) -> str:
+    return self._tree.tags[self._tree.tag[self._index]]
+
+  to_formatted_string = TokenNode.to_formatted_string
+
+
+class CompactLeafNode(CompactNode):
+  """View of a null node stored in CompactTree."""
+  __slots__ = ()
+
+  to_formatted_string = LeafNode.to_formatted_string
+
+
 @dataclasses.dataclass
 class Error:
   line: int
@@ -357,11 +1306,295 @@ class Error:
 
 @dataclasses.dataclass
 class SyntaxData:
-  source_code: Optional[str] = None
-  tree: Optional[RootNode] = None
-  tokens: Optional[List[Token]] = None
-  rawtokens: Optional[List[Token]] = None
+  source_code: Optional[Union[bytes, MappedSource]] = None
+  tree: Optional[Union[RootNode, CompactBranchNode]] = None
+  tokens: Optional[Union[List[Token], TokenTable]] = None
+  rawtokens: Optional[Union[List[Token], TokenTable]] = None
   errors: Optional[List[Error]] = None
+  _line_starts: Optional[List[int]] = dataclasses.field(
+      default=None, init=False, repr=False, compare=False)
+
+  # Conversions between byte offsets and 0-based line/column pairs, as used
+  # by Error. Columns count bytes from the start of the line.
+
+  @property
+  def line_starts(self) -> List[int]:
+    """Byte offsets of line beginnings; computed on first access."""
+    if self._line_starts is None:
+      source = self.source_code[:] if self.source_code else b""
+      lengths = map(len, source.split(b"\n")[:-1])
+      # A list rather than an array: bisect is faster on lists
+      self._line_starts = list(itertools.accumulate(
+          map(operator.add, lengths, itertools.repeat(1)), initial=0))
+    return self._line_starts
+
+  def offset_to_linecol(self, offset: int) -> Tuple[int, int]:
+    """Returns line and column of a byte offset."""
+    line_starts = self.line_starts
+    line = bisect.bisect_right(line_starts, offset) - 1
+    return line, offset - line_starts[line]
+
+  def linecol_to_offset(self, line: int, column: int) -> int:
+    """Returns byte offset of a line and column."""
+    return self.line_starts[line] + column
+
+  def offsets_to_linecols(self, offsets: Iterable[int]) \
+                          -> Tuple[array.array, array.array]:
+    """Converts byte offsets, e.g. ``TokenTable.start``, in a single pass.
+
+    Returns:
+      Arrays of lines and columns.
+    """
+    line_starts = self.line_starts
+    offsets = array.array("q", offsets)
+    lines = array.array("q", map(
+        operator.sub,
+        map(functools.partial(bisect.bisect_right, line_starts), offsets),
+        itertools.repeat(1)))
+    columns = array.array("q", map(
+        operator.sub, offsets, map(line_starts.__getitem__, lines)))
+    return lines, columns
+
+  def linecols_to_offsets(self, lines: Iterable[int],
+                          columns: Iterable[int]) -> array.array:
+    """Converts lines and columns to byte offsets in a single pass."""
+    return array.array("q", map(
+        operator.add, map(self.line_starts.__getitem__, lines), columns))
+
+
+@dataclasses.dataclass
+class FileStats:
+  """Parsing statistics of a single file.
+
+  Durations are in seconds. ``json_decode`` is the time spent decoding the
+  file's entry of the parser output; it is 0 for files found in the cache.
+  ``nodes`` is counted only if enabled in ParseStats.
+  """
+  path: str
+  cached: bool = False
+  source_bytes: int = 0
+  json_decode: float = 0.0
+  read_source: float = 0.0
+  transform_tree: float = 0.0
+  transform_tokens: float = 0.0
+  nodes: int = 0
+  tokens: int = 0
+  errors: int = 0
+
+  def to_dict(self) -> Dict[str, Any]:
+    return dataclasses.asdict(self)
+
+
+class ParseStats:
+  """Collects per-file and per-phase statistics of VeribleVerilogSyntax.
+
+  Pass an instance as ``stats`` to VeribleVerilogSyntax to enable it.
+  Collecting costs a few clock reads per file, so it can stay enabled.
+  Counting syntax tree nodes takes another walk of each tree, so it is
+  done only if ``count_nodes`` is True; otherwise ``nodes`` stays 0.
+  ``callback`` is called with the FileStats of each parsed file, e.g. to
+  emit it as a structured log record::
+
+    stats = ParseStats(lambda s: logger.info(json.dumps(s.to_dict())))
+
+  Attributes:
+    totals: sums of FileStats fields over all files, plus ``files``,
+      ``cache_hits``, ``cache_misses``, ``processes`` (parser processes
+      started), ``subprocess`` (seconds spent waiting for parser output)
+      and ``output_chars`` (length of parser output).
+    files: FileStats of all files if ``keep_files`` is True.
+  """
+
+  _SUMMED = ("source_bytes", "json_decode", "read_source", "transform_tree",
+             "transform_tokens", "nodes", "tokens", "errors")
+
+  def __init__(self, callback: Optional[Callable[[FileStats], None]] = None,
+               keep_files: bool = False, count_nodes: bool = False):
+    self.callback = callback
+    self.keep_files = keep_files
+    self.count_nodes = count_nodes
+    self._lock = threading.Lock()
+    self.reset()
+
+  def reset(self) -> None:
+    with self._lock:
+      self.files = []
+      self.totals = dict.fromkeys(
+          ("files", "cache_hits", "cache_misses", "processes", "subprocess",
+           "output_chars", *self._SUMMED), 0)
+
+  def add_file(self, file_stats: FileStats) -> None:
+    with self._lock:
+      totals = self.totals
+      totals["files"] += 1
+      totals["cache_hits" if file_stats.cached else "cache_misses"] += 1
+      for name in self._SUMMED:
+        totals[name] += getattr(file_stats, name)
+      if self.keep_files:
+        self.files.append(file_stats)
+    if self.callback is not None:
+      self.callback(file_stats)
+
+  def add_process(self, subprocess_time: float, output_chars: int) -> None:
+    with self._lock:
+      self.totals["processes"] += 1
+      self.totals["subprocess"] += subprocess_time
+      self.totals["output_chars"] += output_chars
+
+  def to_dict(self) -> Dict[str, Any]:
+    with self._lock:
+      result = {"totals": dict(self.totals)}
+      if self.keep_files:
+        result["files"] = [s.to_dict() for s in self.files]
+    return result
+
+
+def _count_json_nodes(tree: Optional[Dict[str, Any]]) -> int:
+  """Returns the number of nodes, including null nodes, of a JSON tree"""
+  if tree is None:
+    return 0
+  count = 0
+  stack = [tree]
+  while stack:
+    node = stack.pop()
+    count += 1
+    if node is not None and "children" in node:
+      stack.extend(node["children"])
+  return count
+
+
+class _JsonObjectStream:
+  """Incremental decoder of a top-level JSON object.
+
+  Text is fed in arbitrary chunks, and each ``"key": value`` member of the
+  top-level object is decoded with ``json.JSONDecoder.raw_decode`` as soon
+  as it is complete, so only one member has to be held in memory at a time.
+
+  Complete members are spotted without scanning the text in Python. In
+  pretty-printed output, such as ``--export_json``'s, a member ends with a
+  line holding just a closing brace at the indentation of the member keys,
+  which ``str.find`` looks for; JSON strings can't contain raw line breaks,
+  so it can't match inside one. The line is only a hint for when to try
+  decoding. Text that isn't pretty-printed is decoded by ``finish``.
+  A top-level ``null`` is taken as an empty object.
+  """
+  _decoder = json.JSONDecoder()
+  _WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+  # Expecting: the opening brace; the first member or the closing brace;
+  # a member; a comma or the closing brace; nothing
+  _START, _FIRST, _MEMBER, _NEXT, _DONE = range(5)
+
+  def __init__(self):
+    self._parts = []
+    self._state = self._START
+    # Closing line of members; "" until the first member is seen, None if
+    # the text isn't pretty-printed
+    self._end_line = ""
+    # End of the text fed so far, in case the closing line spans chunks
+    self._tail = ""
+
+  def feed(self, chunk: str) -> Iterator[Tuple[str, Any]]:
+    """Adds text and yields all members completed by it."""
+    self._parts.append(chunk)
+    end_line = self._end_line
+    if end_line is None:
+      return
+    if end_line:
+      window = self._tail + chunk
+      self._tail = window[1 - len(end_line):]
+      if end_line not in window:
+        return
+    text = "".join(self._parts)
+    # Closing lines before the window have been seen by earlier calls
+    pos = yield from self._decode(text, False,
+                                  len(text) - len(window) if end_line else 0)
+    rest = text[pos:]
+    self._parts = [rest]
+    if self._end_line:
+      self._tail = rest[1 - len(self._end_line):]
+
+  def finish(self) -> Iterator[Tuple[str, Any]]:
+    """Yields the remaining members and checks that the object is complete.
+
+    Raises:
+      json.JSONDecodeError: if the text fed isn't a single JSON object.
+    """
+    text = "".join(self._parts)
+    self._parts = []
+    yield from self._decode(text, True)
+
+  def _decode(self, text: str, final: bool, search_from: int = 0) \
+              -> Iterator[Tuple[str, Any]]:
+    """Yields members decoded from text and returns the position after them.
+
+    Unless ``final`` is set, decoding stops before a member that may be
+    incomplete, i.e. one not followed by a closing line at or after
+    ``search_from``.
+    """
+    raw_decode = self._decoder.raw_decode
+    skip_whitespace = self._WHITESPACE.match
+    pos = 0
+    while True:
+      pos = skip_whitespace(text, pos).end()
+      if pos == len(text):
+        if final and self._state != self._DONE:
+          raise json.JSONDecodeError("Unterminated object", text, pos)
+        return pos
+      char = text[pos]
+      state = self._state
+      if state == self._DONE:
+        raise json.JSONDecodeError("Extra data", text, pos)
+      if state == self._START:
+        if char == "n":
+          # The parser prints null when none of its files could be read
+          if (not final and len(text) - pos < 4
+              and "null".startswith(text[pos:])):
+            return pos
+          if not text.startswith("null", pos):
+            raise json.JSONDecodeError("Expecting '{'", text, pos)
+          self._state = self._DONE
+          pos += 4
+          continue
+        if char != "{":
+          raise json.JSONDecodeError("Expecting '{'", text, pos)
+        self._state = self._FIRST
+        pos += 1
+        continue
+      if state != self._MEMBER and char == "}":
+        self._state = self._DONE
+        pos += 1
+        continue
+      if state == self._NEXT:
+        if char != ",":
+          raise json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+        self._state = self._MEMBER
+        pos += 1
+        continue
+
+      if self._end_line == "":
+        # Members end at the indentation of the first key
+        line_start = text.rfind("\n", 0, pos) + 1
+        indent = text[line_start:pos]
+        self._end_line = ("\n" + indent + "}" if line_start
+                          and not indent.strip() else None)
+      if not final and (self._end_line is None
+                        or text.find(self._end_line, max(pos, search_from)) < 0):
+        return pos
+      try:
+        key, end = raw_decode(text, pos)
+        end = skip_whitespace(text, end).end()
+        if not isinstance(key, str) or not text.startswith(":", end):
+          raise json.JSONDecodeError("Expecting member", text, pos)
+        value, end = raw_decode(text, skip_whitespace(text, end + 1).end())
+      except json.JSONDecodeError:
+        # Not complete yet, unless the text has ended
+        if final:
+          raise
+        return pos
+      self._state = self._NEXT
+      pos = end
+      yield key, value
 
 
 class VeribleVerilogSyntax:
@@ -372,40 +1605,146 @@ class VeribleVerilogSyntax:
 
   Args:
     executable: path to ``verible-verilog-syntax`` binary.
+    cache: optional ``syntax_cache.SyntaxCache``. Files found in the cache
+      are not passed to the parser.
+    stats: optional ParseStats collecting per-file and per-phase statistics.
   """
 
-  def __init__(self, executable: str = "verible-verilog-syntax"):
+  _READ_SIZE = 1 << 16
+
+  def __init__(self, executable: str = "verible-verilog-syntax",
+               cache: Optional["syntax_cache.SyntaxCache"] = None,
+               stats: Optional[ParseStats] = None):
     self.executable = executable
+    self.cache = cache
+    self.stats = stats
+    self._parser_id = None
+
+  def _get_parser_id(self) -> str:
+    """Identity of the parser binary used in cache keys"""
+    if self._parser_id is None:
+      path = shutil.which(self.executable) or self.executable
+      path = os.path.realpath(path)
+      try:
+        st = os.stat(path)
+        self._parser_id = f"{path}:{st.st_size}:{st.st_mtime_ns}"
+      except OSError:
+        self._parser_id = path
+    return self._parser_id
 
   @staticmethod
-  def _transform_tree(tree, data: SyntaxData, skip_null: bool) -> RootNode:
-    def transform(tree):
-      if tree is None:
-        return None
-      if "children" in tree:
-        children = [
-          transform(child) or LeafNode()
-            for child in tree["children"]
-            if not (skip_null and child is None)
-        ]
-        tag = tree["tag"]
-        return BranchNode(tag, children=children)
-      tag = tree["tag"]
-      start = tree["start"]
-      end = tree["end"]
-      return TokenNode(tag, start, end)
-
+  def _transform_tree(tree, data: SyntaxData, skip_null: bool,
+                      keep_tags: Optional[Iterable[str]] = None) -> RootNode:
     if "children" not in tree:
       return None
+    root = RootNode(tree["tag"], syntax_data=data)
+    if keep_tags is not None:
+      keep_tags = frozenset(keep_tags)
+      if tree["tag"] not in keep_tags:
+        return VeribleVerilogSyntax._transform_pruned_tree(
+            tree, root, skip_null, keep_tags)
+    return VeribleVerilogSyntax._transform_branch(tree, skip_null, root)
 
-    children = [
-      transform(child) or LeafNode()
-        for child in tree["children"]
-        if not (skip_null and child is None)
-    ]
-    tag = tree["tag"]
-    return RootNode(tag, syntax_data=data, children=children)
+  @staticmethod
+  def _transform_branch(tree, skip_null: bool,
+                        node: Optional[BranchNode] = None) -> BranchNode:
+    """Converts a JSON branch with its subtree.
 
+    The branch itself is converted into ``node`` if given, or into a new
+    BranchNode.
+    """
+    # Depth-first with an explicit stack of (JSON branch, iterator over its
+    # JSON children, list of converted children); a branch node is created
+    # once all its children are converted
+    stack = [(tree, iter(tree["children"]), [])]
+    while True:
+      branch, json_children, children = stack[-1]
+      for child in json_children:
+        if child is None:
+          if not skip_null:
+            children.append(LeafNode())
+        elif "children" in child:
+          stack.append((child, iter(child["children"]), []))
+          break
+        else:
+          children.append(TokenNode(child["tag"], child["start"],
+                                    child["end"]))
+      else:
+        stack.pop()
+        if not stack:
+          if node is None:
+            node = BranchNode(branch["tag"], children=children)
+          else:
+            node.children = children
+          node._update_span()
+          return node
+        converted = BranchNode(branch["tag"], children=children)
+        converted._update_span()
+        stack[-1][2].append(converted)
+
+  @staticmethod
+  def _transform_pruned_tree(tree, root: RootNode, skip_null: bool,
+                             keep_tags: FrozenSet[str]) -> RootNode:
+    """Converts only subtrees of nodes with ``keep_tags`` and their ancestors.
+
+    Spans of the ancestors are computed from the whole JSON tree, so their
+    ``text`` includes the dropped parts. Null nodes outside of the kept
+    subtrees are dropped.
+    """
+    # Frames of [JSON branch, iterator over its JSON children, converted
+    # children, span start, span end]
+    stack = [[tree, iter(tree["children"]), [], None, None]]
+    while True:
+      frame = stack[-1]
+      for child in frame[1]:
+        if child is None:
+          continue
+        if "children" not in child:
+          if frame[3] is None:
+            frame[3] = child["start"]
+          frame[4] = child["end"]
+          if child["tag"] in keep_tags:
+            frame[2].append(TokenNode(child["tag"], child["start"],
+                                      child["end"]))
+        elif child["tag"] in keep_tags:
+          node = VeribleVerilogSyntax._transform_branch(child, skip_null)
+          if node.start is not None:
+            if frame[3] is None:
+              frame[3] = node.start
+            frame[4] = node.end
+          frame[2].append(node)
+        else:
+          stack.append([child, iter(child["children"]), [], None, None])
+          break
+      else:
+        stack.pop()
+        branch, _, children, start, end = frame
+        if stack:
+          parent = stack[-1]
+          if start is not None:
+            if parent[3] is None:
+              parent[3] = start
+            parent[4] = end
+          if not children:
+            continue
+          node = BranchNode(branch["tag"], children=children)
+        else:
+          node = root
+          node.children = children
+        # Set after attaching children, which resets the span
+        node._start = start
+        node._end = end
+        node._span_valid = True
+        if not stack:
+          return root
+        stack[-1][2].append(node)
+
+  @staticmethod
+  def _transform_lazy_tree(tree, data: SyntaxData,
+                           skip_null: bool) -> Optional[LazyRootNode]:
+    if "children" not in tree:
+      return None
+    return LazyRootNode(tree["tag"], tree, skip_null, syntax_data=data)
 
   @staticmethod
   def _transform_tokens(tokens, data: SyntaxData) -> List[Token]:
@@ -420,14 +1759,179 @@ class VeribleVerilogSyntax:
   def _parse(self, paths: List[str], input_: str = None,
              options: Dict[str, Any] = None) -> Dict[str, SyntaxData]:
     """Common implementation of parse_* methods"""
-    options = {
+    data = dict(self._iter_parse(paths, input_, options, streaming=False))
+    if self.cache is not None:
+      # Cached files are yielded first; restore verible's path order
+      data = dict(sorted(data.items()))
+    return data
+
+  def _iter_parse(self, paths: List[str], input_: str = None,
+                  options: Dict[str, Any] = None, streaming: bool = True) \
+                  -> Iterator[Tuple[str, SyntaxData]]:
+    """Runs the parser and yields results file by file.
+
+    With ``streaming`` set, parser output is decoded incrementally and each
+    file is yielded as soon as its entry is complete; otherwise the whole
+    output is read and decoded at once, which is faster.
+    """
+    options = VeribleVerilogSyntax._with_default_options(options)
+
+    cache_keys = {}
+    if self.cache is not None:
+      parser_id = self._get_parser_id()
+      misses = []
+      for path in paths:
+        source = VeribleVerilogSyntax._read_source(path, input_)
+        if source is None:
+          misses.append(path)
+          continue
+        key = self.cache.key(source, parser_id, options)
+        file_json = self.cache.get(key)
+        if file_json is None:
+          # The source is read again when the file's output is decoded, so
+          # only one file's source is held at a time
+          misses.append(path)
+          cache_keys[path] = key
+          continue
+        # Sources already read are reused unless mapping was requested
+        if options["source_mode"] != "read":
+          source = None
+        yield path, self._transform_file_with_stats(
+            path, file_json, input_, options, source,
+            self._file_stats(path, cached=True))
+      paths = misses
+      # The parser has no output for files which can't be read
+      if not cache_keys:
+        return
+
+    args = VeribleVerilogSyntax._parser_args(options)
+    proc = subprocess.Popen([self.executable, *args , *paths],
+        stdin=subprocess.PIPE if input_ is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        encoding="utf-8")
+
+    writer = None
+    if input_ is not None:
+      def write_input():
+        with proc.stdin:
+          proc.stdin.write(input_)
+      writer = threading.Thread(target=write_input, daemon=True)
+      writer.start()
+
+    try:
+      # [seconds spent waiting for parser output, length of the output]
+      process_stats = [0.0, 0]
+      read_output = (self._stream_output if streaming
+                     else self._read_output)
+      for file_path, file_json, decode_time in read_output(proc.stdout,
+                                                           process_stats):
+        file_stats = self._file_stats(file_path)
+        if file_stats is not None:
+          file_stats.json_decode = decode_time
+        if file_path in cache_keys:
+          self.cache.put(cache_keys[file_path], file_json)
+        yield file_path, self._transform_file_with_stats(
+            file_path, file_json, input_, options, None, file_stats)
+      if self.stats is not None:
+        self.stats.add_process(*process_stats)
+    finally:
+      if proc.poll() is None:
+        proc.kill()
+      proc.stdout.close()
+      proc.wait()
+      if writer:
+        writer.join()
+
+  def _read_output(self, stdout, process_stats: List[Any]) \
+                   -> Iterator[Tuple[str, Any, float]]:
+    """Reads and decodes the whole parser output.
+
+    Yields (file path, JSON data, decoding time) of each file entry; the
+    decoding time of the output is split evenly among the files.
+    """
+    start = time.perf_counter()
+    output = stdout.read()
+    decode_start = time.perf_counter()
+    # The parser prints null when none of its files could be read
+    json_data = json.loads(output) or {}
+    decode_time = time.perf_counter() - decode_start
+    process_stats[0] += decode_start - start
+    process_stats[1] += len(output)
+    del output
+    decode_time /= max(1, len(json_data))
+    for file_path, file_json in json_data.items():
+      yield file_path, file_json, decode_time
+
+  def _stream_output(self, stdout, process_stats: List[Any]) \
+                     -> Iterator[Tuple[str, Any, float]]:
+    """Reads and decodes parser output incrementally.
+
+    Yields (file path, JSON data, decoding time) of each file entry as soon
+    as it is complete.
+    """
+    stream = _JsonObjectStream()
+    decode_time = 0.0
+    while True:
+      start = time.perf_counter()
+      chunk = stdout.read(self._READ_SIZE)
+      process_stats[0] += time.perf_counter() - start
+      if not chunk:
+        break
+      process_stats[1] += len(chunk)
+      start = time.perf_counter()
+      for file_path, file_json in stream.feed(chunk):
+        yield file_path, file_json, decode_time + time.perf_counter() - start
+        decode_time = 0.0
+        start = time.perf_counter()
+      # Decoding of an entry split across chunks counts towards its file
+      decode_time += time.perf_counter() - start
+    start = time.perf_counter()
+    for file_path, file_json in stream.finish():
+      yield file_path, file_json, decode_time + time.perf_counter() - start
+      decode_time = 0.0
+      start = time.perf_counter()
+
+  def _file_stats(self, path: str, cached: bool = False) \
+                  -> Optional[FileStats]:
+    """Returns a new FileStats if statistics are enabled"""
+    return FileStats(path, cached) if self.stats is not None else None
+
+  def _transform_file_with_stats(self, file_path: str,
+                                 file_json: Optional[Dict[str, Any]],
+                                 input_: Optional[str],
+                                 options: Dict[str, Any],
+                                 source_code: Optional[bytes],
+                                 file_stats: Optional[FileStats]) \
+                                 -> SyntaxData:
+    """_transform_file, reporting ``file_stats`` to ``self.stats``"""
+    file_data = VeribleVerilogSyntax._transform_file(
+        file_path, file_json, input_, options, source_code, file_stats)
+    if file_stats is not None:
+      if self.stats.count_nodes and file_json:
+        file_stats.nodes = _count_json_nodes(file_json.get("tree"))
+      self.stats.add_file(file_stats)
+    return file_data
+
+  @staticmethod
+  def _with_default_options(options: Optional[Dict[str, Any]]) \
+                            -> Dict[str, Any]:
+    """Returns parsing options with defaults filled in"""
+    return {
       "gen_tree": True,
       "skip_null": False,
+      "compact_tree": False,
+      "lazy_tree": False,
+      "keep_tags": None,
+      "source_mode": "read",
       "gen_tokens": False,
       "gen_rawtokens": False,
+      "token_table": False,
       **(options or {}),
     }
 
+  @staticmethod
+  def _parser_args(options: Dict[str, Any]) -> List[str]:
+    """Returns ``verible-verilog-syntax`` arguments for parsing options"""
     args = ["-export_json"]
     if options["gen_tree"]:
       args.append("-printtree")
@@ -435,46 +1939,127 @@ class VeribleVerilogSyntax:
       args.append("-printtokens")
     if options["gen_rawtokens"]:
       args.append("-printrawtokens")
+    return args
 
-    proc = subprocess.run([self.executable, *args , *paths],
-        stdout=subprocess.PIPE,
-        input=input_,
-        encoding="utf-8",
-        check=False)
+  @staticmethod
+  def _read_source(file_path: str, input_: Optional[str]) -> Optional[bytes]:
+    """Returns source bytes of a file, or None if it can't be read"""
+    if file_path == "-":
+      return input_.encode("utf-8") if input_ is not None else None
+    try:
+      with open(file_path, "rb") as f:
+        return f.read()
+    except OSError:
+      return None
 
-    json_data = json.loads(proc.stdout)
-    data = {}
-    for file_path, file_json in json_data.items():
-      file_data = SyntaxData()
+  @staticmethod
+  def _transform_file(file_path: str, file_json: Optional[Dict[str, Any]],
+                      input_: Optional[str], options: Dict[str, Any],
+                      source_code: Optional[bytes] = None,
+                      file_stats: Optional[FileStats] = None) -> SyntaxData:
+    """Builds SyntaxData from a single file entry of ``--export_json`` output
 
-      if file_path == "-":
-        file_data.source_code = input_.encode("utf-8")
+    If ``file_stats`` is given, phase durations and counts are stored in it.
+    """
+    file_json = file_json or {}
+    file_data = SyntaxData()
+    start = time.perf_counter()
+
+    if source_code is not None:
+      file_data.source_code = source_code
+    elif file_path == "-":
+      file_data.source_code = input_.encode("utf-8")
+    elif options["source_mode"] == "read":
+      with open(file_path, "rb") as f:
+        file_data.source_code = f.read()
+    elif options["source_mode"] in ("mmap", "lazy"):
+      file_data.source_code = MappedSource(
+          file_path, lazy=options["source_mode"] == "lazy")
+    else:
+      raise ValueError(f"Invalid source_mode: {options['source_mode']!r}")
+    read_end = time.perf_counter()
+
+    if "tree" in file_json:
+      if options.get("compact_tree"):
+        tree = CompactTree.from_json(file_json["tree"], file_data,
+                                     options["skip_null"])
+        file_data.tree = tree.root if tree else None
+      elif options.get("lazy_tree"):
+        file_data.tree = VeribleVerilogSyntax._transform_lazy_tree(
+            file_json["tree"], file_data, options["skip_null"])
       else:
-        with open(file_path, "rb") as f:
-          file_data.source_code = f.read()
-
-      if "tree" in file_json:
         file_data.tree = VeribleVerilogSyntax._transform_tree(
-            file_json["tree"], file_data, options["skip_null"])
-
-      if "tokens" in file_json:
-        file_data.tokens = VeribleVerilogSyntax._transform_tokens(
-            file_json["tokens"], file_data)
+            file_json["tree"], file_data, options["skip_null"],
+            options.get("keep_tags"))
+    tree_end = time.perf_counter()
+
+    transform_tokens = VeribleVerilogSyntax._transform_tokens
+    if options.get("token_table"):
+      transform_tokens = TokenTable.from_json
+
+    if "tokens" in file_json:
+      file_data.tokens = transform_tokens(file_json["tokens"], file_data)
+
+    if "rawtokens" in file_json:
+      file_data.rawtokens = transform_tokens(file_json["rawtokens"], file_data)
+    tokens_end = time.perf_counter()
+
+    if "errors" in file_json:
+      file_data.errors = VeribleVerilogSyntax._transform_errors(
+                         file_json["errors"])
+
+    if file_stats is not None:
+      file_stats.read_source = read_end - start
+      file_stats.transform_tree = tree_end - read_end
+      file_stats.transform_tokens = tokens_end - tree_end
+      if not isinstance(file_data.source_code, MappedSource) \
+          or file_data.source_code.opened:
+        file_stats.source_bytes = len(file_data.source_code or b"")
+      file_stats.tokens = len(file_json.get("tokens") or ()) \
+                          + len(file_json.get("rawtokens") or ())
+      file_stats.errors = len(file_data.errors or ())
+
+    return file_data
 
-      if "rawtokens" in file_json:
-        file_data.rawtokens = VeribleVerilogSyntax._transform_tokens(
-            file_json["rawtokens"], file_data)
-
-      if "errors" in file_json:
-        file_data.errors = VeribleVerilogSyntax._transform_errors(
-                           file_json["errors"])
-
-      data[file_path] = file_data
-
-    return data
+  @staticmethod
+  def _shard_paths(paths: List[str], shards: int) -> List[List[str]]:
+    """Splits paths into at most ``shards`` lists of similar total file size.
 
-  def parse_files(self, paths: List[str], options: Dict[str, Any] = None) \
-                  -> Dict[str, SyntaxData]:
+    Files are assigned greedily, largest first, to the currently lightest
+    shard. Paths which can't be stat'ed count as empty files. The parser
+    leaves unreadable files out of its output, and prints ``null`` if a
+    shard holds only such files, which is read as an empty result.
+    """
+    def size(path):
+      try:
+        return os.path.getsize(path)
+      except OSError:
+        return 0
+
+    sizes = {path: size(path) for path in paths}
+    shards = max(1, min(shards, len(paths)))
+    heap = [(0, i) for i in range(shards)]
+    result = [[] for _ in range(shards)]
+    for path in sorted(paths, key=sizes.get, reverse=True):
+      total, i = heapq.heappop(heap)
+      result[i].append(path)
+      heapq.heappush(heap, (total + sizes[path], i))
+    return [shard for shard in result if shard]
+
+  def _parse_sharded(self, paths: List[str], jobs: int,
+                     options: Dict[str, Any] = None) -> Dict[str, SyntaxData]:
+    """Runs one parser process per shard of ``paths`` on a thread pool"""
+    shards = VeribleVerilogSyntax._shard_paths(paths, jobs)
+    data = {}
+    with concurrent.futures.ThreadPoolExecutor(len(shards)) as executor:
+      for shard_data in executor.map(
+          lambda shard: self._parse(shard, options=options), shards):
+        data.update(shard_data)
+    # verible emits files sorted by path; keep the serial order
+    return dict(sorted(data.items()))
+
+  def parse_files(self, paths: List[str], options: Dict[str, Any] = None,
+                  jobs: int = 1) -> Dict[str, SyntaxData]:
     """Parse multiple SystemVerilog files.
 
     Args:
@@ -483,14 +2068,76 @@ class VeribleVerilogSyntax:
         Available options:
           gen_tree (boolean): whether to generate syntax tree.
           skip_null (boolean): null nodes won't be stored in a tree if True.
+          compact_tree (boolean): store the tree in a CompactTree; ``tree``
+            is then a CompactBranchNode view of its root.
+          lazy_tree (boolean): create nodes of a subtree only when it is
+            first accessed; ``tree`` is then a LazyRootNode.
+          keep_tags (collection of str): convert only subtrees of nodes
+            with these tags, and their ancestors; other subtrees and null
+            nodes are dropped. Ancestors keep the spans, and so the text,
+            of the whole source. Not used with compact_tree and lazy_tree.
+          source_mode (str): how ``source_code`` is loaded: "read" reads
+            the file into bytes, "mmap" memory-maps the file as
+            MappedSource, "lazy" also defers mapping the file until first
+            access. Mapped sources raise SourceChangedError if the file
+            has changed when it is mapped.
           gen_tokens (boolean): whether to generate tokens list.
           gen_rawtokens (boolean): whether to generate raw token list.
+          token_table (boolean): store tokens and raw tokens in TokenTable
+            objects instead of lists of Token objects.
         By default only ``gen_tree`` is True.
+      jobs: number of ``verible-verilog-syntax`` processes to run in
+        parallel. Paths are split into shards of similar total size, one
+        process per shard. Values lower than 1 use ``os.cpu_count()``.
 
     Returns:
       A dict that maps file names to their parsing results in SyntaxData object.
     """
-    return self._parse(paths, options = options)
+    if jobs < 1:
+      jobs = os.cpu_count() or 1
+    if jobs == 1 or len(paths) < 2:
+      return self._parse(paths, options = options)
+    return self._parse_sharded(paths, jobs, options = options)
+
+  def iter_parse_files(self, paths: List[str],
+                       options: Dict[str, Any] = None) \
+                       -> Iterator[Tuple[str, SyntaxData]]:
+    """Parse multiple SystemVerilog files, yielding results one at a time.
+
+    Parser output is decoded incrementally while the parser is still running,
+    so only a single file's JSON data and SyntaxData are built at once. Memory
+    use is bounded by the largest file rather than by the whole batch, as long
+    as the caller doesn't keep the yielded results.
+
+    Args:
+      paths: list of paths to files to parse.
+      options: dict with parsing options.
+        Available options:
+          gen_tree (boolean): whether to generate syntax tree.
+          skip_null (boolean): null nodes won't be stored in a tree if True.
+          compact_tree (boolean): store the tree in a CompactTree; ``tree``
+            is then a CompactBranchNode view of its root.
+          lazy_tree (boolean): create nodes of a subtree only when it is
+            first accessed; ``tree`` is then a LazyRootNode.
+          keep_tags (collection of str): convert only subtrees of nodes
+            with these tags, and their ancestors; other subtrees and null
+            nodes are dropped. Ancestors keep the spans, and so the text,
+            of the whole source. Not used with compact_tree and lazy_tree.
+          source_mode (str): how ``source_code`` is loaded: "read" reads
+            the file into bytes, "mmap" memory-maps the file as
+            MappedSource, "lazy" also defers mapping the file until first
+            access. Mapped sources raise SourceChangedError if the file
+            has changed when it is mapped.
+          gen_tokens (boolean): whether to generate tokens list.
+          gen_rawtokens (boolean): whether to generate raw token list.
+          token_table (boolean): store tokens and raw tokens in TokenTable
+            objects instead of lists of Token objects.
+        By default only ``gen_tree`` is True.
+
+    Yields:
+      Tuples of file name and its parsing results in SyntaxData object.
+    """
+    yield from self._iter_parse(paths, options = options)
 
   def parse_file(self, path: str, options: Dict[str, Any] = None) \
                  -> Optional[SyntaxData]:
@@ -502,8 +2149,23 @@ class VeribleVerilogSyntax:
         Available options:
           gen_tree (boolean): whether to generate syntax tree.
           skip_null (boolean): null nodes won't be stored in a tree if True.
+          compact_tree (boolean): store the tree in a CompactTree; ``tree``
+            is then a CompactBranchNode view of its root.
+          lazy_tree (boolean): create nodes of a subtree only when it is
+            first accessed; ``tree`` is then a LazyRootNode.
+          keep_tags (collection of str): convert only subtrees of nodes
+            with these tags, and their ancestors; other subtrees and null
+            nodes are dropped. Ancestors keep the spans, and so the text,
+            of the whole source. Not used with compact_tree and lazy_tree.
+          source_mode (str): how ``source_code`` is loaded: "read" reads
+            the file into bytes, "mmap" memory-maps the file as
+            MappedSource, "lazy" also defers mapping the file until first
+            access. Mapped sources raise SourceChangedError if the file
+            has changed when it is mapped.
           gen_tokens (boolean): whether to generate tokens list.
           gen_rawtokens (boolean): whether to generate raw token list.
+          token_table (boolean): store tokens and raw tokens in TokenTable
+            objects instead of lists of Token objects.
         By default only ``gen_tree`` is True.
 
     Returns:
@@ -521,8 +2183,18 @@ class VeribleVerilogSyntax:
         Available options:
           gen_tree (boolean): whether to generate syntax tree.
           skip_null (boolean): null nodes won't be stored in a tree if True.
+          compact_tree (boolean): store the tree in a CompactTree; ``tree``
+            is then a CompactBranchNode view of its root.
+          lazy_tree (boolean): create nodes of a subtree only when it is
+            first accessed; ``tree`` is then a LazyRootNode.
+          keep_tags (collection of str): convert only subtrees of nodes
+            with these tags, and their ancestors; other subtrees and null
+            nodes are dropped. Ancestors keep the spans, and so the text,
+            of the whole source. Not used with compact_tree and lazy_tree.
           gen_tokens (boolean): whether to generate tokens list.
           gen_rawtokens (boolean): whether to generate raw token list.
+          token_table (boolean): store tokens and raw tokens in TokenTable
+            objects instead of lists of Token objects.
         By default only ``gen_tree`` is True.
 
     Returns:
@@ -0,0 +1,16 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# Modules in src/ import each other as top-level modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+@pytest.fixture
+def verible():
+    """Path to verible-verilog-syntax, from $VERIBLE_VERILOG_SYNTAX or PATH"""
+    path = os.environ.get('VERIBLE_VERILOG_SYNTAX') or shutil.which('verible-verilog-syntax')
+    if not path:
+        pytest.skip('verible-verilog-syntax not available')
+    return path
@@ -0,0 +1,56 @@
+import random
+
+import anytree
+
+from analysis_module_info import AnalysisModuleInfo
+
+def module(path, name, *types):
+    return {'path': path, 'name': name, 'ports': [], 'parameters': [], 'imports': [],
+            'instances': {'type': list(types), 'name': [f'u{i}' for i in range(len(types))]}}
+
+def build(files):
+    analyzer = AnalysisModuleInfo({})
+    for path in sorted(files):
+        analyzer._replace_file_modules(path, files[path])
+    return analyzer
+
+def state(analyzer):
+    return (analyzer.parse_top_module(),
+            {name: [(pre, node.name) for pre, _, node in anytree.RenderTree(root)]
+             for name, root in analyzer.parse_hierarchy().items()},
+            sorted(analyzer.modules_info.items()))
+
+def test_updates_match_fresh_build():
+    rng = random.Random(2)
+    paths = [f'f{i}.sv' for i in range(5)]
+    # Each file defines its own modules, with an occasional duplicate
+    pools = {path: [f'm{i}{j}' for j in range(3)] for i, path in enumerate(paths)}
+    names = sorted(name for pool in pools.values() for name in pool)
+    files = {}
+    analyzer = AnalysisModuleInfo({})
+    for _ in range(200):
+        path = rng.choice(paths)
+        if path in files and rng.random() < 0.2:
+            del files[path]
+            analyzer._replace_file_modules(path, {})
+        else:
+            defined = rng.sample(pools[path] if rng.random() < 0.9 else names, rng.randrange(1, 4))
+            files[path] = {name: module(path, name, *(rng.choice(names[names.index(name) + 1:] or ['nope'])
+                                                      for _ in range(rng.randrange(3))))
+                           for name in defined}
+            analyzer._replace_file_modules(path, files[path])
+        analyzer.parse_hierarchy()
+        # Duplicate definitions resolve to the last added file, which
+        # depends on history; compare only designs without them
+        defined = [name for modules in files.values() for name in modules]
+        if len(defined) == len(set(defined)):
+            assert state(analyzer) == state(build(files))
+
+def test_top_module_order():
+    files = {'b.sv': {'y': module('b.sv', 'y'), 'x': module('b.sv', 'x')},
+             'a.sv': {'z': module('a.sv', 'z')}}
+    analyzer = AnalysisModuleInfo({})
+    for path in ('b.sv', 'a.sv', 'b.sv'):
+        analyzer._replace_file_modules(path, files[path])
+    assert analyzer.parse_top_module() == ['z', 'y', 'x']
+    assert list(analyzer.parse_hierarchy()) == ['z', 'y', 'x']
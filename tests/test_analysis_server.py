@@ -0,0 +1,68 @@
+import json
+import threading
+
+import pytest
+
+import analysis_client
+from analysis_module_info import AnalysisModuleInfo
+from analysis_server import AnalysisServer
+from design_watcher import DesignWatcher
+from verible_verilog_syntax import VeribleVerilogSyntax
+
+def module(path, name, types=(), names=()):
+    return {'path': path, 'name': name, 'ports': [], 'parameters': [], 'imports': [],
+            'instances': {'type': list(types), 'name': list(names)}}
+
+@pytest.fixture
+def server(tmp_path):
+    analyzer = AnalysisModuleInfo({})
+    analyzer._replace_file_modules('a.sv', {
+        'top': module('a.sv', 'top', ['mid', 'nope'], ['u_mid', 'u_nope']),
+        'mid': module('a.sv', 'mid', ['leaf', 'leaf']),
+        'leaf': module('a.sv', 'leaf'),
+    })
+    # No watched paths, so the parser is never run
+    watcher = DesignWatcher(VeribleVerilogSyntax('verible-verilog-syntax'), [], analyzer)
+    server = AnalysisServer(str(tmp_path / 'server.sock'), watcher, interval=0.01)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+def query(server, **request):
+    return list(analysis_client.query(request, server.server_address))
+
+def test_top(server):
+    assert query(server, command='top') == ['top']
+
+def test_hierarchy(server):
+    lines = query(server, command='hierarchy')
+    roots = server.watcher.analyzer.parse_hierarchy().values()
+    assert lines == [line for root in roots for line in root.render_lines()]
+    assert [line.split()[-3] for line in lines] == ['top', 'u_mid', 'leaf', 'leaf#2', 'u_nope']
+    assert len(query(server, command='hierarchy', top='mid', max_depth=0)) == 1
+    assert len(query(server, command='hierarchy', top='mid')) == 3
+
+def test_module(server):
+    lines = query(server, command='module', name='mid')
+    assert json.loads('\n'.join(lines)) == server.watcher.analyzer.modules_info['mid']
+
+@pytest.mark.parametrize('request_', [
+    {'command': 'module', 'name': 'nope'}, {'command': 'hierarchy', 'top': 'nope'},
+    {'command': 'bogus'}, {'name': 'top'}])
+def test_errors(server, request_):
+    with pytest.raises(analysis_client.QueryError):
+        list(analysis_client.query(request_, server.server_address))
+    # The server keeps serving
+    assert query(server, command='top') == ['top']
+
+def test_stop(tmp_path):
+    watcher = DesignWatcher(VeribleVerilogSyntax('verible-verilog-syntax'), [], AnalysisModuleInfo({}))
+    with AnalysisServer(str(tmp_path / 'server.sock'), watcher, interval=0.01) as server:
+        thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+        thread.start()
+        assert query(server, command='stop') == []
+        thread.join(5)
+        assert not thread.is_alive()
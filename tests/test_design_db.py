@@ -0,0 +1,45 @@
+from analysis_module_info import AnalysisModuleInfo
+from design_db import DesignDatabase
+
+def module(path, name, types=(), names=(), ports=()):
+    return {'path': path, 'name': name, 'ports': list(ports), 'parameters': ['W'], 'imports': ['pkg::*'],
+            'instances': {'type': list(types), 'name': list(names)}}
+
+def analyzer():
+    analyzer = AnalysisModuleInfo({})
+    analyzer._replace_file_modules('a.sv', {
+        'top': module('a.sv', 'top', ['mid', 'leaf', 'nope'], ['u0', 'u1', 'u2'], ['clk']),
+        'mid': module('a.sv', 'mid', ['leaf', 'leaf']),
+    })
+    analyzer._replace_file_modules('b.sv', {'leaf': module('b.sv', 'leaf')})
+    return analyzer
+
+def test_round_trip(tmp_path):
+    design = analyzer()
+    path = str(tmp_path / 'design.db')
+    design.write_database(path)
+    with DesignDatabase(path) as db:
+        expected = {name: {**info, 'file': info['path']} for name, info in design.modules_info.items()}
+        assert db.get_names() == list(design.modules_info)
+        assert {name: db.get_module_info(name) for name in expected} == expected
+        assert list(db.iter_module_info()) == list(expected.values())
+        assert db.get_module_info('nope') is None
+        assert db.search_top_module() == design.parse_top_module() == ['top']
+        assert db.search_parent('leaf') == ['top', 'mid']
+        assert db.search_parent('top') == []
+
+def test_write_replaces(tmp_path):
+    path = str(tmp_path / 'design.db')
+    analyzer().write_database(path)
+    with DesignDatabase(path) as db:
+        db.write_modules([module('c.sv', 'mid', ['other'])])
+        assert db.get_module_info('mid')['instances']['type'] == ['other']
+        assert db.search_parent('leaf') == ['top']
+        db.remove_modules(['top'])
+        assert sorted(db.get_names()) == ['leaf', 'mid']
+        assert sorted(db.search_top_module()) == ['leaf', 'mid']
+    # Writing the model again replaces the whole content
+    analyzer().write_database(path)
+    with DesignDatabase(path) as db:
+        assert sorted(db.get_names()) == ['leaf', 'mid', 'top']
+        assert db.search_parent('other') == []
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from design_watcher import DesignWatcher
+from verible_verilog_syntax import VeribleVerilogSyntax
+
+def write(path, text):
+    path.write_text(text)
+    # Distinct modification times even on coarse-grained file systems
+    write.mtime += 1_000_000_000
+    os.utime(path, ns=(write.mtime, write.mtime))
+write.mtime = 1_000_000_000_000_000_000
+
+def kinds(events):
+    return [(event.kind, os.path.basename(event.path), sorted(event.modules)) for event in events]
+
+@pytest.fixture
+def watcher(verible, tmp_path):
+    write(tmp_path / 'top.sv', 'module top; mid u0(); endmodule\n')
+    write(tmp_path / 'mid.sv', 'module mid; endmodule\n')
+    return DesignWatcher(VeribleVerilogSyntax(verible), [str(tmp_path)])
+
+def test_no_changes(watcher, tmp_path):
+    assert watcher.poll() == []
+    os.utime(tmp_path / 'mid.sv', ns=(write.mtime + 5, write.mtime + 5))
+    assert watcher.poll() == []
+
+def test_add_modify_remove(watcher, tmp_path):
+    assert watcher.analyzer.parse_top_module() == ['top']
+    write(tmp_path / 'other.sv', 'module other; endmodule\n')
+    assert kinds(watcher.poll()) == [('added', 'other.sv', ['other']),
+                                     ('top_modules', '', ['other', 'top'])]
+
+    write(tmp_path / 'top.sv', 'module top; endmodule\n')
+    assert kinds(watcher.poll()) == [('modified', 'top.sv', ['top']),
+                                     ('top_modules', '', ['mid', 'other', 'top'])]
+
+    os.remove(tmp_path / 'other.sv')
+    assert kinds(watcher.poll()) == [('removed', 'other.sv', ['other']),
+                                     ('top_modules', '', ['mid', 'top'])]
+
+def test_whitespace_edit(watcher, tmp_path):
+    write(tmp_path / 'other.sv', 'module other; endmodule\n')
+    watcher.poll()
+    # Reparsing may change the order of top modules, but not the set
+    write(tmp_path / 'top.sv', 'module top;  mid u0(); endmodule\n')
+    assert kinds(watcher.poll()) == [('modified', 'top.sv', ['top'])]
+
+def test_file_deleted_before_parse(watcher, tmp_path):
+    parse_files = watcher.parser.parse_files
+    def delete_and_parse(paths, *args, **kwargs):
+        os.remove(tmp_path / 'mid.sv')
+        return parse_files(paths, *args, **kwargs)
+    write(tmp_path / 'mid.sv', 'module mid; leaf u0(); endmodule\n')
+    watcher.parser.parse_files = delete_and_parse
+    assert kinds(watcher.poll()) == [('removed', 'mid.sv', ['mid'])]
+    watcher.parser.parse_files = parse_files
+    write(tmp_path / 'mid.sv', 'module mid; endmodule\n')
+    assert kinds(watcher.poll()) == [('added', 'mid.sv', ['mid'])]
+
+def test_run(watcher, tmp_path):
+    polls = []
+    def on_change(events):
+        polls.append(kinds(events))
+        watcher.stop()
+    write(tmp_path / 'mid.sv', 'module mid; endmodule // edited\n')
+    watcher.run(0.01, on_change)
+    assert polls == [[('modified', 'mid.sv', ['mid'])]]
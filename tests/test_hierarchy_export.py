@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+
+import anytree
+
+from analysis_module_info import AnalysisModuleInfo
+from hierarchy_export import InstanceRecord, iter_instances, write_csv, write_dot, write_jsonl
+
+def module(path, name, types, names=()):
+    return {'path': path, 'name': name, 'ports': [], 'parameters': [], 'imports': [],
+            'instances': {'type': list(types), 'name': list(names)}}
+
+def analyzer():
+    analyzer = AnalysisModuleInfo({})
+    analyzer._replace_file_modules('top.sv', {
+        'top': module('top.sv', 'top', ['mid', 'mid', 'nope'], ['u0', 'u1', 'u2']),
+        'mid': module('top.sv', 'mid', ['leaf', 'leaf', 'mid2']),
+        'mid2': module('top.sv', 'mid2', ['mid']),
+    })
+    analyzer._replace_file_modules('leaf.sv', {'leaf': module('leaf.sv', 'leaf', [])})
+    return analyzer
+
+def test_paths_match_instance_trees():
+    design = analyzer()
+    tree_paths = [
+        '.'.join(n.name for n in node.path)
+        for root in design.parse_hierarchy().values() for node in anytree.PreOrderIter(root)]
+    assert [record.path for record in iter_instances(design)] == tree_paths
+    assert 'top.u0.leaf#2' in tree_paths
+
+def records(**kwargs):
+    return list(iter_instances(analyzer(), **kwargs))
+
+def test_records():
+    assert [(r.path, r.module, r.file, r.depth, r.kind) for r in records()] == [
+        ('top', 'top', 'top.sv', 0, 'top'),
+        ('top.u0', 'mid', 'top.sv', 1, 'instance'),
+        ('top.u0.leaf', 'leaf', 'leaf.sv', 2, 'instance'),
+        ('top.u0.leaf#2', 'leaf', 'leaf.sv', 2, 'instance'),
+        ('top.u0.mid2', 'mid2', 'top.sv', 2, 'instance'),
+        ('top.u0.mid2.mid', 'mid', 'top.sv', 3, 'recursive'),
+        ('top.u1', 'mid', 'top.sv', 1, 'instance'),
+        ('top.u1.leaf', 'leaf', 'leaf.sv', 2, 'instance'),
+        ('top.u1.leaf#2', 'leaf', 'leaf.sv', 2, 'instance'),
+        ('top.u1.mid2', 'mid2', 'top.sv', 2, 'instance'),
+        ('top.u1.mid2.mid', 'mid', 'top.sv', 3, 'recursive'),
+        ('top.u2', 'nope', '', 1, 'unfounded'),
+    ]
+    assert [r.path for r in records(top_modules=['mid2'], max_depth=1)] == ['mid2', 'mid2.mid']
+    assert [r.path for r in records(filter_=lambda r: r.module == 'leaf')][:2] == ['top.u0.leaf', 'top.u0.leaf#2']
+
+def test_escaped_identifiers():
+    design = AnalysisModuleInfo({})
+    design._replace_file_modules('a.sv', {
+        'top': module('a.sv', 'top', ['a'], ['\\u.x']),
+        'a': module('a.sv', 'a', ['b'], ['u']),
+        'b': module('a.sv', 'b', []),
+    })
+    assert [r.path for r in iter_instances(design)] == ['top', 'top.\\u.x ', 'top.\\u.x .u']
+
+def test_jsonl():
+    output = io.StringIO()
+    write_jsonl(records(max_depth=1), output)
+    assert [json.loads(line) for line in output.getvalue().splitlines()] \
+        == [r._asdict() for r in records(max_depth=1)]
+
+def test_csv():
+    output = io.StringIO()
+    write_csv(records(max_depth=1), output)
+    rows = list(csv.reader(io.StringIO(output.getvalue())))
+    assert rows[0] == list(InstanceRecord._fields)
+    assert rows[1:] == [[str(value) for value in r] for r in records(max_depth=1)]
+
+def test_dot():
+    output = io.StringIO()
+    # Instances left out by the filter are skipped over
+    write_dot(records(filter_=lambda r: r.module != 'mid2'), output)
+    lines = output.getvalue().splitlines()
+    assert lines[:2] == ['digraph hierarchy {', '  node [shape=box];'] and lines[-1] == '}'
+    edges = [line.strip() for line in lines if '->' in line]
+    assert edges == [
+        '"top" -> "top.u0";', '"top.u0" -> "top.u0.leaf";', '"top.u0" -> "top.u0.leaf#2";',
+        '"top.u0" -> "top.u0.mid2.mid";',
+        '"top" -> "top.u1";', '"top.u1" -> "top.u1.leaf";', '"top.u1" -> "top.u1.leaf#2";',
+        '"top.u1" -> "top.u1.mid2.mid";',
+        '"top" -> "top.u2";']
+    assert '  "top.u2" [label="u2\\nnope"];' in lines
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from verible_verilog_syntax import _JsonObjectStream
+
+DATA = {
+    'a.sv': {'tree': {'tag': 'kDescriptionList', 'children': [
+        {'tag': '{', 'start': 0, 'end': 1}, None,
+        {'tag': '}', 'start': 1, 'end': 2}]}},
+    'dir/b "c".sv': {'errors': [{'line': 0, 'column': 3, 'phase': 'parse',
+                                 'message': 'syntax error at "}\\n{" ,\t\\u00e9'}]},
+    '{}[],:': {'tokens': []},
+    'd.sv': {},
+}
+
+def decode(chunks):
+    stream = _JsonObjectStream()
+    members = []
+    for chunk in chunks:
+        members.extend(stream.feed(chunk))
+    members.extend(stream.finish())
+    return members
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+@pytest.mark.parametrize('indent', [2, 4, None])
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 1 << 16])
+def test_chunk_boundaries(indent, size):
+    text = json.dumps(DATA, indent=indent)
+    assert decode(split(text, size)) == list(DATA.items())
+
+def test_escapes_and_braces_in_strings():
+    data = {'"}\n  }': {'x': '\\"}'}, '\\': ['\n  }', '{', '"']}
+    for indent in (2, None):
+        text = json.dumps(data, indent=indent)
+        for size in (1, 5, len(text)):
+            assert decode(split(text, size)) == list(data.items())
+
+def test_members_yielded_before_end():
+    text = json.dumps(DATA, indent=2)
+    first_end = text.index('\n  }') + len('\n  }')
+    stream = _JsonObjectStream()
+    assert list(stream.feed(text[:first_end])) == [('a.sv', DATA['a.sv'])]
+    # 'd.sv' is written on a single line, so it is only known to be
+    # complete at the end
+    assert list(stream.feed(text[first_end:])) == list(DATA.items())[1:3]
+    assert list(stream.finish()) == [('d.sv', {})]
+
+@pytest.mark.parametrize('text', ['{}', ' {\n}\n', 'null\n', ''])
+def test_empty(text):
+    if text:
+        assert decode([text]) == []
+        assert decode(split(text, 1)) == []
+    else:
+        with pytest.raises(json.JSONDecodeError):
+            decode([text])
+
+@pytest.mark.parametrize('indent', [2, None])
+def test_early_close(indent):
+    text = json.dumps(DATA, indent=indent)
+    for end in (1, text.index('"d.sv"'), len(text) - 1):
+        with pytest.raises(json.JSONDecodeError):
+            decode(split(text[:end], 3))
+
+@pytest.mark.parametrize('text', ['[]', '{"a": 1,}', '{"a" 1}', '{1: 2}', '{"a": 1} x', 'nul', 'nulls'])
+def test_invalid(text):
+    with pytest.raises(json.JSONDecodeError):
+        decode([text])
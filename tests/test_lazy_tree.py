@@ -0,0 +1,86 @@
+import anytree
+import pytest
+
+from verible_verilog_syntax import (LevelOrderTreeIterator, PostOrderTreeIterator,
+                                    PreOrderTreeIterator, SyntaxData, TokenNode,
+                                    VeribleVerilogSyntax)
+
+def branch(tag, *children):
+    return {'tag': tag, 'children': list(children)}
+
+def token(tag, start):
+    return {'tag': tag, 'start': start, 'end': start + 1}
+
+TREE = branch('R',
+    branch('A',
+        branch('B', token('C', 0)),
+        token('C', 1),
+        branch('A',
+            branch('B', token('C', 2), None),
+            branch('E'),
+            token('D', 3))),
+    None,
+    branch('B', token('C', 4)))
+
+def eager(skip_null):
+    return VeribleVerilogSyntax._transform_tree(TREE, SyntaxData(), skip_null)
+
+def lazy(skip_null):
+    return VeribleVerilogSyntax._transform_lazy_tree(TREE, SyntaxData(), skip_null)
+
+def key(node):
+    return (getattr(node, 'tag', None), getattr(node, 'start', None), node.depth)
+
+def keys(nodes):
+    return [key(node) for node in nodes]
+
+@pytest.mark.parametrize('skip_null', [False, True])
+def test_tree_properties(skip_null):
+    assert lazy(skip_null).height == eager(skip_null).height == 4
+    assert lazy(skip_null).is_leaf is eager(skip_null).is_leaf is False
+    assert keys(lazy(skip_null).leaves) == keys(eager(skip_null).leaves)
+    assert lazy(skip_null).size == eager(skip_null).size
+
+    tree = lazy(skip_null)
+    empty = tree.children[0].children[2].children[1]
+    assert empty.tag == 'E' and empty.is_leaf and empty.height == 0
+
+@pytest.mark.parametrize('iterator', [
+    PreOrderTreeIterator, PostOrderTreeIterator, LevelOrderTreeIterator,
+    anytree.PreOrderIter, anytree.PostOrderIter, anytree.LevelOrderIter])
+@pytest.mark.parametrize('skip_null', [False, True])
+def test_iterators(iterator, skip_null):
+    assert keys(iterator(lazy(skip_null))) == keys(iterator(eager(skip_null)))
+
+@pytest.mark.parametrize('iterator', [PreOrderTreeIterator, PostOrderTreeIterator, LevelOrderTreeIterator])
+@pytest.mark.parametrize('filter_', [{'tag': 'C'}, {'tag': ['B', 'D']}, lambda node: node.is_leaf])
+def test_iter_find_all(iterator, filter_):
+    assert keys(lazy(False).iter_find_all(filter_, iter_=iterator)) \
+        == keys(eager(False).iter_find_all(filter_, iter_=iterator))
+
+@pytest.mark.parametrize('skip_null', [False, True])
+def test_span_after_attach(skip_null):
+    for tree in (lazy(skip_null), eager(skip_null)):
+        assert tree.end == 5
+        last = tree.children[-1]
+        last.children
+        TokenNode('u', 5, 7, parent=last)
+        assert (last.end, tree.end) == (7, 7)
+
+def chain(depth):
+    tree = token('T', 0)
+    for i in range(depth):
+        tree = branch('B', tree, token('T', i + 1))
+    return tree
+
+def test_deep_tree():
+    depth = 5000
+    tree = VeribleVerilogSyntax._transform_lazy_tree(
+        chain(depth), SyntaxData(source_code=b'x' * (depth + 1)), False)
+    node = tree
+    while node.children:
+        node = node.children[0]
+    assert node.start == 0
+    assert (tree.start, tree.end, len(tree.text)) == (0, depth + 1, depth + 1)
+    assert len(list(tree.iter_find_all({'tag': 'T'}))) == depth + 1
+    assert tree.height == depth and not tree.is_leaf
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from verible_verilog_syntax import MappedSource, SourceChangedError
+
+TEXT = b'module a; endmodule\n'
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'a.sv'
+    path.write_bytes(TEXT)
+    return str(path)
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_behaves_like_bytes(path, lazy):
+    source = MappedSource(path, lazy=lazy)
+    assert source.opened is not lazy
+    assert len(source) == len(TEXT) and source
+    assert source.opened
+    for key in (slice(7, 8), slice(-9, None), slice(None, None, 2), slice(5, 2), slice(100, 200)):
+        assert source[key] == TEXT[key]
+    assert source[0] == TEXT[0] and source[-1] == TEXT[-1]
+    with pytest.raises(IndexError):
+        source[len(TEXT)]
+    assert bytes(source) == TEXT
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.sv'
+    path.write_bytes(b'')
+    source = MappedSource(str(path))
+    assert len(source) == 0 and not source and source[:] == b''
+
+def test_mappings_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(MappedSource, 'max_mapped', 2)
+    sources = []
+    for i in range(5):
+        path = tmp_path / f'{i}.sv'
+        path.write_bytes(b'%d' % i)
+        sources.append(MappedSource(str(path)))
+    assert len(MappedSource._mappings) <= 2
+    # Unmapped sources are mapped again
+    assert [source[:] for source in sources] == [b'%d' % i for i in range(5)]
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_changed_file(path, lazy):
+    source = MappedSource(path, lazy=lazy)
+    source.close()
+    with open(path, 'ab') as f:
+        f.write(b'// more\n')
+    with pytest.raises(SourceChangedError):
+        source[0:6]
+
+def test_replaced_file(path):
+    source = MappedSource(path)
+    os.replace(path, path + '.old')
+    with open(path, 'wb') as f:
+        f.write(b'x' + TEXT)
+    # The mapping of the parsed file is kept
+    assert source[:6] == b'module'
+    source.close()
+    with pytest.raises(SourceChangedError):
+        source[:6]
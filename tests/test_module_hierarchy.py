@@ -0,0 +1,89 @@
+import random
+
+import anytree
+
+from analysis_module_info import LeafInstance, ModuleHierarchy
+
+def module(name, *types):
+    return {'name': name, 'instances': {'type': list(types), 'name': []}}
+
+MODULES = {
+    'top': module('top', 'mid', 'mid', 'leaf', 'nope'),
+    'mid': module('mid', 'leaf'),
+    'leaf': module('leaf'),
+}
+
+def render(node):
+    return [(pre, n.name, type(n).__name__) for pre, _, n in anytree.RenderTree(node)]
+
+def test_unexpanded_tree_properties():
+    hierarchy = ModuleHierarchy(MODULES, ['top'])
+    root = hierarchy.instance_tree('top')
+    assert not root.is_leaf
+    assert root.height == 2
+    assert [node.name for node in root.leaves] == ['leaf', 'leaf', 'leaf', 'nope']
+
+    mid = hierarchy.instance_tree('top').children[0]
+    assert not mid.is_leaf
+    assert mid.height == 1
+
+def test_attach_to_unexpanded_node():
+    root = ModuleHierarchy(MODULES, ['top']).instance_tree('top')
+    LeafInstance('extra', None, parent=root)
+    assert [node.name for node in root.children] == ['mid', 'mid#2', 'leaf', 'nope', 'extra']
+
+def test_lazy_tree_matches_eager_tree():
+    hierarchy = ModuleHierarchy(MODULES, ['top'])
+    lazy = hierarchy.instance_tree('top')
+    eager = hierarchy.instance_tree('top')
+    for node in anytree.PreOrderIter(eager):
+        node.children
+    assert render(lazy) == render(eager)
+
+def top_modules(modules):
+    children = {child for info in modules.values() for child in info['instances']['type'] if child != info['name']}
+    return [name for name in modules if name not in children]
+
+def state(hierarchy, modules):
+    names = [*modules, 'nope']
+    return (hierarchy.edges, hierarchy.back_edges,
+            {name: hierarchy.instance_count(name) for name in names},
+            {name: render(hierarchy.instance_tree(name)) for name in top_modules(modules)})
+
+def test_updates_match_rebuild():
+    rng = random.Random(1)
+    names = [f'm{i}' for i in range(12)]
+    modules = {name: module(name) for name in names[:8]}
+    hierarchy = ModuleHierarchy(modules, top_modules(modules))
+    state(hierarchy, modules)
+    for _ in range(300):
+        name = rng.choice(names)
+        if name in modules and rng.random() < 0.2:
+            del modules[name]
+        else:
+            # Mostly edges down the list, so that cycles are rare and small
+            types = [rng.choice(names[names.index(name):] if rng.random() < 0.8 else names + ['nope'])
+                     for _ in range(rng.randrange(4))]
+            modules[name] = module(name, *types)
+        hierarchy.update_modules({name}, top_modules(modules))
+        expected = ModuleHierarchy(dict(modules), top_modules(modules))
+        assert state(hierarchy, modules) == state(expected, modules)
+
+def test_deep_hierarchy():
+    depth = 5000
+    modules = {f'm{i}': module(f'm{i}', f'm{i + 1}', 'nope') for i in range(depth)}
+    hierarchy = ModuleHierarchy(modules, ['m0'])
+    assert hierarchy.instance_count('m0') == 2 * depth + 1
+    root = hierarchy.instance_tree('m0')
+    assert root.height == depth
+    assert not root.is_leaf
+
+def test_instance_names():
+    modules = {
+        'top': {'name': 'top', 'instances': {'type': ['mid', 'leaf'], 'name': ['u_mid', 'u_leaf']}},
+        'mid': module('mid', 'leaf', 'leaf', 'nope', 'leaf'),
+        'leaf': module('leaf'),
+    }
+    root = ModuleHierarchy(modules, ['top']).instance_tree('top')
+    assert [node.name for node in anytree.PreOrderIter(root)] \
+        == ['top', 'u_mid', 'leaf', 'leaf#2', 'nope', 'leaf#3', 'u_leaf']
@@ -0,0 +1,39 @@
+import pytest
+
+from verible_verilog_syntax import VeribleVerilogSyntax
+
+SOURCES = {
+    'a.sv': 'module a; b u0(); b u1(); endmodule\n',
+    'b.sv': 'module b; endmodule\n',
+    'c.sv': 'module c(input x); assign y = x; endmodule\n' * 3,
+    'err.sv': 'module e; endmodul\n',
+}
+
+@pytest.fixture
+def paths(tmp_path):
+    for name, text in SOURCES.items():
+        (tmp_path / name).write_text(text)
+    return [str(tmp_path / name) for name in SOURCES]
+
+def summary(data):
+    return {path: (file_data.tree and file_data.tree.text, [token.tag for token in file_data.tokens or ()],
+                   [(error.line, error.column) for error in file_data.errors or ()])
+            for path, file_data in data.items()}
+
+@pytest.mark.parametrize('jobs', [2, 3, 8])
+def test_sharded_matches_serial(verible, paths, tmp_path, jobs):
+    parser = VeribleVerilogSyntax(verible)
+    paths = [*paths, str(tmp_path / 'missing.sv')]
+    options = {'gen_tree': True, 'gen_tokens': True}
+    serial = parser.parse_files(paths, options)
+    sharded = parser.parse_files(paths, options, jobs=jobs)
+    assert summary(sharded) == summary(serial)
+    assert list(sharded) == list(serial)
+    assert str(tmp_path / 'missing.sv') not in serial
+
+def test_only_unreadable_files(verible, tmp_path):
+    parser = VeribleVerilogSyntax(verible)
+    missing = [str(tmp_path / 'x.sv'), str(tmp_path / 'y.sv')]
+    assert parser.parse_files(missing) == {}
+    assert parser.parse_files(missing, jobs=2) == {}
+    assert list(parser.iter_parse_files(missing)) == []
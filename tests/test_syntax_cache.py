@@ -0,0 +1,64 @@
+import os
+
+from syntax_cache import SyntaxCache
+from verible_verilog_syntax import VeribleVerilogSyntax
+
+def write(tmp_path, files):
+    for name, text in files.items():
+        (tmp_path / name).write_text(text)
+    return [str(tmp_path / name) for name in files]
+
+def test_warm_cache_with_missing_file(verible, tmp_path):
+    paths = write(tmp_path, {'a.sv': 'module a; endmodule\n'})
+    cache = SyntaxCache(str(tmp_path / 'cache'))
+    parser = VeribleVerilogSyntax(verible, cache=cache)
+    missing = str(tmp_path / 'missing.sv')
+    cold = parser.parse_files([*paths, missing])
+    assert list(cold) == paths
+    warm = parser.parse_files([*paths, missing])
+    assert list(warm) == paths
+    assert warm[paths[0]].tree.text == cold[paths[0]].tree.text
+    assert [path for path, _ in parser.iter_parse_files([missing, *paths])] == paths
+    assert cache.hits == 2
+
+TREE = {'tree': {'tag': 'kDescriptionList', 'children': [None, {'tag': 'x', 'start': 0, 'end': 1}]}}
+
+def test_hit_and_miss(tmp_path):
+    cache = SyntaxCache(str(tmp_path))
+    key = SyntaxCache.key(b'module a; endmodule', 'parser', {'gen_tree': True})
+    assert cache.get(key) is None
+    cache.put(key, TREE)
+    assert cache.get(key) == TREE
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Entries persist across instances
+    assert SyntaxCache(str(tmp_path)).get(key) == TREE
+
+def test_key_depends_on_content_parser_and_options():
+    key = SyntaxCache.key(b'a', 'parser', {'gen_tree': True})
+    assert key == SyntaxCache.key(b'a', 'parser', {'gen_tree': True, 'lazy_tree': True})
+    assert key != SyntaxCache.key(b'b', 'parser', {'gen_tree': True})
+    assert key != SyntaxCache.key(b'a', 'other', {'gen_tree': True})
+    assert key != SyntaxCache.key(b'a', 'parser', {'gen_tree': True, 'gen_tokens': True})
+
+def test_eviction(tmp_path):
+    cache = SyntaxCache(str(tmp_path), max_size=1)
+    keys = [SyntaxCache.key(b'%d' % i, 'parser', {}) for i in range(3)]
+    for key in keys:
+        cache.put(key, TREE)
+    # At least the latest entry is kept
+    assert [cache.get(key) is not None for key in keys] == [False, False, True]
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_invalidated_by_edit(verible, tmp_path):
+    paths = write(tmp_path, {'a.sv': 'module a; endmodule\n', 'b.sv': 'module b; endmodule\n'})
+    cache = SyntaxCache(str(tmp_path / 'cache'))
+    parser = VeribleVerilogSyntax(verible, cache=cache)
+    parser.parse_files(paths)
+    assert (cache.hits, cache.misses) == (0, 2)
+    write(tmp_path, {'b.sv': 'module b2; endmodule\n'})
+    data = parser.parse_files(paths)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert data[paths[1]].tree.text == 'module b2; endmodule'
+    # Other options need other entries
+    parser.parse_files(paths, {'gen_tree': True, 'gen_tokens': True})
+    assert (cache.hits, cache.misses) == (1, 5)
@@ -0,0 +1,122 @@
+import pytest
+
+import tree_query
+import verible_verilog_syntax
+from verible_verilog_syntax import CompactTree, SyntaxData, VeribleVerilogSyntax
+
+def branch(tag, *children):
+    return {'tag': tag, 'children': list(children)}
+
+def token(tag, start):
+    return {'tag': tag, 'start': start, 'end': start + 1}
+
+# Pre-order positions in comments
+TREE = branch('R',                              # 0
+    branch('A',                                 # 1
+        branch('B', token('C', 0)),             # 2, 3
+        token('C', 1),                          # 4
+        branch('A',                             # 5
+            branch('B', token('C', 2), None),   # 6, 7, 8 (null)
+            token('D', 3))),                    # 9
+    branch('B', token('C', 4)))                 # 10, 11
+
+def trees():
+    '''The same tree as a RootNode, CompactTree and lazy tree; the first two
+    are searched with the tag index, the lazy one by traversal.'''
+    return {
+        'root': VeribleVerilogSyntax._transform_tree(TREE, SyntaxData(), False),
+        'compact': CompactTree.from_json(TREE, None, False).root,
+        'lazy': VeribleVerilogSyntax._transform_lazy_tree(TREE, SyntaxData(), False),
+    }
+
+def summary(matches):
+    return [(m.name, m.node.position, {name: c.position for name, c in m.captures.items()})
+            for m in matches]
+
+def run(selectors, tree):
+    query = tree_query.TreeQuery(selectors)
+    return summary(query.iter_matches(tree))
+
+@pytest.mark.parametrize('selector, steps', [
+    ('A', [(False, {'A'}, None)]),
+    ('A@a B|C > *@x', [(False, {'A'}, 'a'), (False, {'B', 'C'}, None), (True, None, 'x')]),
+    ('  A>B   >C ', [(False, {'A'}, None), (True, {'B'}, None), (True, {'C'}, None)]),
+    ("'{' > '}'@brace", [(False, {"'{'"}, None), (True, {"'}'"}, 'brace')]),
+])
+def test_compile(selector, steps):
+    assert [(step.child, step.tags and set(step.tags), step.capture)
+            for step in tree_query._compile(selector)] == steps
+
+@pytest.mark.parametrize('selector', ['', '>', '> A', 'A >', 'A > > B', 'A@', 'A|', '|A', '*|A', 'A@b@c', 'A@b-c'])
+def test_compile_errors(selector):
+    with pytest.raises(ValueError):
+        tree_query.TreeQuery({'x': selector})
+
+@pytest.mark.parametrize('kind', ['root', 'compact', 'lazy'])
+def test_descendant_and_child(kind):
+    tree = trees()[kind]
+    assert run({'x': 'A C'}, tree) == [('x', 3, {}), ('x', 4, {}), ('x', 7, {}), ('x', 7, {})]
+    assert run({'x': 'A > C'}, tree) == [('x', 4, {})]
+    assert run({'x': 'A > B > C'}, tree) == [('x', 3, {}), ('x', 7, {})]
+    assert run({'x': 'R > B C'}, tree) == [('x', 11, {})]
+    assert run({'x': 'R > * > C'}, tree) == [('x', 4, {}), ('x', 11, {})]
+    assert run({'x': 'A > * D'}, tree) == [('x', 9, {})]
+    assert run({'x': 'A > B D'}, tree) == []
+    # The searched node itself can match the first step only
+    assert run({'x': 'R'}, tree) == [('x', 0, {})]
+    assert run({'x': 'R R'}, tree) == []
+
+@pytest.mark.parametrize('kind', ['root', 'compact', 'lazy'])
+def test_captures(kind):
+    tree = trees()[kind]
+    matches = list(tree_query.TreeQuery({'x': 'A@a > B@b C'}).iter_matches(tree))
+    assert summary(matches) == [('x', 3, {'a': 1, 'b': 2}), ('x', 7, {'a': 5, 'b': 6})]
+    node = matches[1].node
+    assert (node.node.tag, node.depth, node.node.start) == ('C', 4, 2)
+    assert matches[1].captures['b'].node.tag == 'B'
+    assert matches[1].captures['b'].depth == 3
+
+@pytest.mark.parametrize('kind', ['root', 'compact', 'lazy'])
+def test_ordering(kind):
+    tree = trees()[kind]
+    # Pre-order of the last nodes; ties by selector, then by the previous
+    # steps' nodes from the last step backwards
+    selectors = {'c': 'A@a C', 'b': 'B', 'bc': 'B@b > C', 'any': '*@a > C'}
+    assert run(selectors, tree) == [
+        ('b', 2, {}),
+        ('c', 3, {'a': 1}), ('bc', 3, {'b': 2}), ('any', 3, {'a': 2}),
+        ('c', 4, {'a': 1}), ('any', 4, {'a': 1}),
+        ('b', 6, {}),
+        ('c', 7, {'a': 1}), ('c', 7, {'a': 5}), ('bc', 7, {'b': 6}), ('any', 7, {'a': 6}),
+        ('b', 10, {}),
+        ('bc', 11, {'b': 10}), ('any', 11, {'a': 10}),
+    ]
+    grouped = tree_query.TreeQuery(selectors).run(tree)
+    assert list(grouped) == list(selectors)
+    assert [m.node.position for m in grouped['c']] == [3, 4, 7, 7]
+
+def test_subtree_positions():
+    # Positions and depths are relative to the searched node
+    for kind, tree in trees().items():
+        inner = tree.children[0].children[2]
+        assert run({'x': 'B@b C'}, inner) == [('x', 2, {'b': 1})], kind
+
+def test_index_and_traversal_agree():
+    selectors = {
+        'a': 'A C', 'b': 'A@x > B@y C', 'c': 'R > A A > B', 'd': 'B|D',
+        'e': 'A D|C', 'f': 'A B@y', 'g': 'R A@x', 'h': 'A@x A@y',
+    }
+    results = {kind: run(selectors, tree) for kind, tree in trees().items()}
+    assert results['root'] == results['lazy']
+    assert results['compact'] == results['lazy']
+
+def test_index_used():
+    root = trees()['root']
+    assert tree_query._tag_index(root) is not None
+    lazy = trees()['lazy']
+    assert tree_query._tag_index(lazy) is not None
+    # Subtrees not created yet have no position until looked up
+    assert lazy._json is not None
+    assert tree_query._tag_index(lazy.children[0].children[2]) is None
+    tree_query.TreeQuery({'x': 'A C'}).run(root)
+    assert root._tag_index is not None